@@ -0,0 +1,211 @@
+"""Метрики запросов в текстовом формате Prometheus.
+
+Каждый процесс пишет свои значения в отдельный файл в METRICS_DIR,
+отображённый в память: запись — это сложение числа по смещению, без
+блокировок между процессами. ``/metrics`` читает все файлы каталога
+и складывает значения, так что сбор идёт по всем рабочим процессам.
+Файлы завершившихся процессов не удаляются, иначе счётчики пошли бы
+назад; каталог чистят при перезапуске всего сервиса.
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+
+# Файл: 8 байт заголовка с длиной занятой части, затем записи
+# «длина ключа, ключ с выравниванием до 8 байт, значение double».
+HEADER = struct.Struct('q')
+KEY_LENGTH = struct.Struct('i')
+VALUE = struct.Struct('d')
+INITIAL_SIZE = 64 * 1024
+
+BUCKETS = {
+    'yatube_request_duration_seconds': (
+        0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+    ),
+    'yatube_request_db_queries': (1, 2, 5, 10, 20, 50, 100, 200, 500),
+}
+FAMILIES = {
+    'yatube_request_duration_seconds': (
+        'histogram', 'Время ответа по имени представления',
+    ),
+    'yatube_request_db_queries': (
+        'histogram', 'Число запросов к БД за ответ по имени представления',
+    ),
+    'yatube_cache_hits_total': (
+        'counter', 'Попадания в кэш по имени представления',
+    ),
+    'yatube_cache_misses_total': (
+        'counter', 'Промахи кэша по имени представления',
+    ),
+}
+SUFFIXES = ('_bucket', '_sum', '_count', '')
+HIT_RATIO = 'yatube_cache_hit_ratio'
+
+_store = None
+_lock = threading.Lock()
+
+
+class MmapStore:
+    """Значения одного процесса в файле, отображённом в память."""
+
+    def __init__(self, path):
+        self._file = open(path, 'a+b')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < INITIAL_SIZE:
+            self._file.truncate(INITIAL_SIZE)
+            size = INITIAL_SIZE
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+        self._used = HEADER.unpack_from(self._mmap)[0] or HEADER.size
+        self._positions = {
+            key: position for key, _, position in _entries(self._mmap)
+        }
+
+    def inc(self, key, amount=1):
+        position = self._positions.get(key)
+        if position is None:
+            position = self._add(key)
+        value = VALUE.unpack_from(self._mmap, position)[0]
+        VALUE.pack_into(self._mmap, position, value + amount)
+
+    def _add(self, key):
+        encoded = key.encode()
+        padded = len(encoded) + (-KEY_LENGTH.size - len(encoded)) % 8
+        entry = (
+            KEY_LENGTH.pack(len(encoded))
+            + encoded.ljust(padded, b' ')
+            + VALUE.pack(0.0)
+        )
+        if self._used + len(entry) > len(self._mmap):
+            size = len(self._mmap)
+            while self._used + len(entry) > size:
+                size *= 2
+            self._mmap.close()
+            self._file.truncate(size)
+            self._mmap = mmap.mmap(self._file.fileno(), size)
+        self._mmap[self._used:self._used + len(entry)] = entry
+        position = self._used + len(entry) - VALUE.size
+        self._used += len(entry)
+        # Длина пишется последней: читатель не увидит запись наполовину.
+        HEADER.pack_into(self._mmap, 0, self._used)
+        self._positions[key] = position
+        return position
+
+
+def _entries(data):
+    used = HEADER.unpack_from(data)[0]
+    position = HEADER.size
+    while position < used:
+        length = KEY_LENGTH.unpack_from(data, position)[0]
+        position += KEY_LENGTH.size
+        key = bytes(data[position:position + length]).decode()
+        position += length + (-KEY_LENGTH.size - length) % 8
+        yield key, VALUE.unpack_from(data, position)[0], position
+        position += VALUE.size
+
+
+def _get_store():
+    """Файл текущего процесса; после fork открывается новый."""
+    global _store
+    path = os.path.join(settings.METRICS_DIR, f'{os.getpid()}.db')
+    if _store is None or _store[0] != path:
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        _store = path, MmapStore(path)
+    return _store[1]
+
+
+def _key(family, suffix, view, le=None):
+    return json.dumps([family, suffix, view, le])
+
+
+def record(view, duration, timing):
+    """Учитывает один ответ представления ``view``.
+
+    Корзины гистограмм хранятся уже накопительными; пустые тоже
+    заводятся, чтобы в выдаче был полный набор.
+    """
+    observations = {
+        'yatube_request_duration_seconds': duration,
+        'yatube_request_db_queries': timing.counts.get('db', 0),
+    }
+    with _lock:
+        store = _get_store()
+        for family, value in observations.items():
+            for bound in BUCKETS[family]:
+                store.inc(
+                    _key(family, '_bucket', view, str(bound)),
+                    int(value <= bound),
+                )
+            store.inc(_key(family, '_bucket', view, '+Inf'))
+            store.inc(_key(family, '_sum', view), value)
+            store.inc(_key(family, '_count', view))
+        store.inc(_key('yatube_cache_hits_total', '', view), timing.hits)
+        store.inc(_key('yatube_cache_misses_total', '', view), timing.misses)
+
+
+def collect():
+    """Сумма значений по файлам всех процессов."""
+    totals = {}
+    if not os.path.isdir(settings.METRICS_DIR):
+        return totals
+    for entry in os.scandir(settings.METRICS_DIR):
+        if not entry.name.endswith('.db'):
+            continue
+        with open(entry.path, 'rb') as source:
+            data = source.read()
+        if len(data) < HEADER.size:
+            continue
+        for key, value, _ in _entries(data):
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def _sample(name, labels, value):
+    labels = ','.join(
+        '{}="{}"'.format(
+            label, text.replace('\\', r'\\').replace('"', r'\"')
+        )
+        for label, text in labels.items()
+    )
+    if value == int(value):
+        value = int(value)
+    return f'{name}{{{labels}}} {value!r}'
+
+
+def exposition():
+    """Все метрики в текстовом формате Prometheus 0.0.4."""
+    samples = defaultdict(list)
+    for key, value in collect().items():
+        family, suffix, view, le = json.loads(key)
+        bound = float(le) if le else 0
+        samples[family].append(
+            (view, SUFFIXES.index(suffix), bound, suffix, le, value)
+        )
+    lines = []
+    for family, (kind, help_text) in FAMILIES.items():
+        lines += [f'# HELP {family} {help_text}', f'# TYPE {family} {kind}']
+        for view, _, _, suffix, le, value in sorted(samples[family]):
+            labels = {'view': view}
+            if le:
+                labels['le'] = le
+            lines.append(_sample(family + suffix, labels, value))
+    lines += [
+        f'# HELP {HIT_RATIO} Доля попаданий в кэш по имени представления',
+        f'# TYPE {HIT_RATIO} gauge',
+    ]
+    hits = {
+        view: value
+        for view, *_, value in samples['yatube_cache_hits_total']
+    }
+    for view, *_, misses in sorted(samples['yatube_cache_misses_total']):
+        lookups = hits.get(view, 0) + misses
+        if lookups:
+            lines.append(_sample(
+                HIT_RATIO, {'view': view},
+                round(hits.get(view, 0) / lookups, 4),
+            ))
+    return '\n'.join(lines) + '\n'
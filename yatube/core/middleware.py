@@ -0,0 +1,100 @@
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import metrics, timing
+
+logger = logging.getLogger(__name__)
+
+SECTIONS = ('db', 'template', 'cache', 'thumbnail')
+
+
+class ServerTimingMiddleware:
+    """Разбивка времени запроса в заголовке Server-Timing и в журнале.
+
+    Замеряется доля запросов SERVER_TIMING_SAMPLE_RATE; при нуле
+    middleware отключается целиком. Разделы пересекаются: время
+    запросов к БД из шаблона входит и в ``db``, и в ``template``.
+    """
+
+    def __init__(self, get_response):
+        self.rate = settings.SERVER_TIMING_SAMPLE_RATE
+        if not self.rate:
+            raise MiddlewareNotUsed
+        timing.instrument()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if self.rate < 1 and random.random() >= self.rate:
+            return self.get_response(request)
+        started = time.perf_counter()
+        with timing.track() as current:
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+        response['Server-Timing'] = self.header(current, total)
+        fields = self.fields(request, response, current, total)
+        logger.info(
+            ' '.join(f'{key}={value}' for key, value in fields.items()),
+            extra={'server_timing': fields},
+        )
+        return response
+
+    def header(self, current, total):
+        metrics = []
+        for name in SECTIONS:
+            if name not in current.counts:
+                continue
+            metric = f'{name};dur={current.durations[name] * 1000:.1f}'
+            if name == 'db':
+                metric += f';desc="{current.counts[name]} queries"'
+            elif name == 'cache':
+                lookups = current.hits + current.misses
+                metric += f';desc="{current.hits}/{lookups} hits"'
+            metrics.append(metric)
+        metrics.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(metrics)
+
+    def fields(self, request, response, current, total):
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 1),
+        }
+        for name in SECTIONS:
+            fields[f'{name}_ms'] = round(
+                current.durations.get(name, 0) * 1000, 1
+            )
+        fields['db_queries'] = current.counts.get('db', 0)
+        fields['cache_hits'] = current.hits
+        fields['cache_misses'] = current.misses
+        return fields
+
+
+class MetricsMiddleware:
+    """Время ответа, число запросов к БД и кэш по имени представления.
+
+    Пишет каждый ответ в хранилище ``core.metrics``; при пустом
+    METRICS_DIR отключается.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_DIR:
+            raise MiddlewareNotUsed
+        timing.instrument()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with timing.track() as current:
+            response = self.get_response(request)
+        match = request.resolver_match
+        metrics.record(
+            match.view_name if match else 'unresolved',
+            time.perf_counter() - started,
+            current,
+        )
+        return response
@@ -1,4 +1,17 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Post, User
+
+from . import metrics
+from .middleware import ServerTimingMiddleware
 
 
 class ViewTestClass(TestCase):
@@ -6,3 +19,133 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, 404)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+@override_settings(SERVER_TIMING_SAMPLE_RATE=1.0)
+class ServerTimingTests(TestCase):
+    """Тестирование разбивки времени запроса"""
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, text='Тестовый пост')
+
+    def metrics(self, response):
+        return {
+            metric.split(';')[0]: metric
+            for metric in response['Server-Timing'].split(', ')
+        }
+
+    def test_header_breaks_down_request(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/')
+        metrics = self.metrics(response)
+        self.assertEqual(
+            set(metrics), {'db', 'template', 'cache', 'total'}
+        )
+        self.assertIn(f'desc="{len(queries)} queries"', metrics['db'])
+        self.assertRegex(metrics['cache'], r'desc="\d+/\d+ hits"')
+
+    def test_log_line(self):
+        with self.assertLogs('core.middleware', 'INFO') as logs:
+            self.client.get('/')
+        record = logs.records[0]
+        self.assertEqual(record.server_timing['path'], '/')
+        self.assertEqual(record.server_timing['status'], 200)
+        self.assertIn('db_queries=', record.getMessage())
+
+    def test_unsampled_request_is_not_measured(self):
+        with override_settings(SERVER_TIMING_SAMPLE_RATE=0.1), \
+                mock.patch('core.middleware.random.random', return_value=0.5):
+            response = self.client.get('/')
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_disabled_middleware(self):
+        with override_settings(SERVER_TIMING_SAMPLE_RATE=0):
+            with self.assertRaises(MiddlewareNotUsed):
+                ServerTimingMiddleware(lambda request: None)
+
+
+class MetricsTests(TestCase):
+    """Тестирование метрик по именам представлений"""
+    def setUp(self):
+        self.metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.metrics_dir, ignore_errors=True)
+        overridden = override_settings(METRICS_DIR=self.metrics_dir)
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+
+    def test_exposition(self):
+        self.client.get('/')
+        self.client.get('/')
+        self.client.get('/nonexist-page/')
+        self.client.force_login(
+            User.objects.create_user(username='admin', is_staff=True)
+        )
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        text = response.content.decode()
+        self.assertIn(
+            '# TYPE yatube_request_duration_seconds histogram', text
+        )
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"} 2', text
+        )
+        self.assertIn(
+            'yatube_request_db_queries_count{view="posts:index"} 2', text
+        )
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="unresolved"} 1',
+            text,
+        )
+        self.assertRegex(
+            text, r'yatube_cache_hit_ratio\{view="posts:index"\} [\d.]+'
+        )
+
+    def test_processes_are_summed(self):
+        self.client.get('/')
+        other = metrics.MmapStore(os.path.join(self.metrics_dir, '1.db'))
+        for _ in range(3):
+            other.inc(metrics._key(
+                'yatube_request_duration_seconds', '_count', 'posts:index'
+            ))
+        text = metrics.exposition()
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 4',
+            text,
+        )
+
+    def test_store_grows(self):
+        store = metrics.MmapStore(os.path.join(self.metrics_dir, '1.db'))
+        for i in range(5000):
+            store.inc(f'key-{i}', i)
+        totals = metrics.collect()
+        self.assertEqual(len(totals), 5000)
+        self.assertEqual(totals['key-4999'], 4999)
+
+    def test_hidden_without_staff_or_token(self):
+        self.client.force_login(User.objects.create_user(username='user'))
+        with override_settings(METRICS_TOKEN='secret'):
+            for headers in ({}, {'HTTP_AUTHORIZATION': 'Bearer wrong'}):
+                with self.subTest(headers=headers):
+                    response = self.client.get(
+                        '/metrics', REMOTE_ADDR='127.0.0.1', **headers
+                    )
+                    self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_bearer_token(self):
+        response = self.client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_disabled_by_default(self):
+        with override_settings(METRICS_DIR=None):
+            self.client.get('/')
+            self.client.force_login(
+                User.objects.create_user(username='admin', is_staff=True)
+            )
+            response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(os.listdir(self.metrics_dir), [])
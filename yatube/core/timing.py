@@ -0,0 +1,130 @@
+"""Замер частей запроса: БД, шаблонов, кэша и миниатюр.
+
+Замер включают middleware из ``core.middleware`` через ``track``;
+вне него ``measure`` ничего не делает, так что вызывать его можно
+откуда угодно, в том числе из фоновых потоков.
+"""
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import Template
+from django.utils.module_loading import import_string
+
+_current = ContextVar('server_timing', default=None)
+_instrumented = False
+
+
+class Timing:
+    """Накопленные за запрос длительности и счётчики по разделам."""
+
+    def __init__(self):
+        self.durations = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.hits = 0
+        self.misses = 0
+        self._active = set()
+
+
+@contextmanager
+def track():
+    """Включает замер на время блока; вложенный вызов продолжает внешний.
+
+    Запросы к БД считаются обёрткой ``connection.execute_wrapper``
+    на всех соединениях.
+    """
+    timing = _current.get()
+    if timing is not None:
+        yield timing
+        return
+    timing = Timing()
+    token = _current.set(timing)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(record_query))
+            yield timing
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def measure(name):
+    """Добавляет время блока к разделу ``name`` текущего запроса.
+
+    Вложенные замеры одного раздела не складываются: например,
+    ``get_many`` кэша, устроенный через ``get``, учитывается один раз.
+    Отдаёт Timing, если замер идёт, иначе None.
+    """
+    timing = _current.get()
+    if timing is None or name in timing._active:
+        yield None
+        return
+    timing._active.add(name)
+    started = time.perf_counter()
+    try:
+        yield timing
+    finally:
+        timing._active.discard(name)
+        timing.durations[name] += time.perf_counter() - started
+        timing.counts[name] += 1
+
+
+def record_query(execute, sql, params, many, context):
+    """Обёртка ``connection.execute_wrapper`` для времени запросов к БД."""
+    with measure('db'):
+        return execute(sql, params, many, context)
+
+
+def _timed_render(render):
+    def wrapper(self, *args, **kwargs):
+        with measure('template'):
+            return render(self, *args, **kwargs)
+    return wrapper
+
+
+def _timed_cache(backend):
+    get, get_many = backend.get, backend.get_many
+
+    def timed_get(self, key, default=None, version=None):
+        with measure('cache') as timing:
+            value = get(self, key, default, version)
+        if timing is not None:
+            if value is default:
+                timing.misses += 1
+            else:
+                timing.hits += 1
+        return value
+
+    def timed_get_many(self, keys, version=None):
+        keys = list(keys)
+        with measure('cache') as timing:
+            found = get_many(self, keys, version)
+        if timing is not None:
+            timing.hits += len(found)
+            timing.misses += len(keys) - len(found)
+        return found
+
+    backend.get, backend.get_many = timed_get, timed_get_many
+
+
+def instrument():
+    """Один раз оборачивает отрисовку шаблонов и чтение из кэшей.
+
+    Запросы к БД оборачиваются в ``track``: обёртки соединения
+    действуют только внутри блока, а шаблоны и кэш такого крючка не дают.
+    """
+    global _instrumented
+    if _instrumented:
+        return
+    _instrumented = True
+    Template.render = _timed_render(Template.render)
+    backends = {
+        import_string(options['BACKEND'])
+        for options in settings.CACHES.values()
+    }
+    for backend in backends:
+        _timed_cache(backend)
@@ -1,5 +1,11 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from . import metrics as request_metrics
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +21,25 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def has_metrics_token(request):
+    if not settings.METRICS_TOKEN:
+        return False
+    expected = f'Bearer {settings.METRICS_TOKEN}'
+    return hmac.compare_digest(
+        request.META.get('HTTP_AUTHORIZATION', '').encode(),
+        expected.encode(),
+    )
+
+
+def metrics(request):
+    """Метрики для Prometheus: для персонала и по токену METRICS_TOKEN."""
+    if not settings.METRICS_DIR or not (
+        request.user.is_staff or has_metrics_token(request)
+    ):
+        raise Http404
+    return HttpResponse(
+        request_metrics.exposition(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
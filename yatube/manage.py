@@ -6,6 +6,10 @@ import sys
 
 def main():
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    if sys.argv[1:2] == ['test']:
+        # Тесты всегда с тестовыми настройками, даже если переменная
+        # окружения указывает на рабочие; --settings по-прежнему главнее.
+        os.environ['DJANGO_SETTINGS_MODULE'] = 'yatube.settings_test'
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from . import fulltext
 from .models import Group, Post, Comment
 
 
@@ -18,6 +19,13 @@ class PostAdmin(admin.ModelAdmin):
     list_editable = ('group',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip() or not fulltext.available():
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return fulltext.search_posts(queryset, search_term), False
+
 
 @admin.register(Group)
 class GroupAdmin(admin.ModelAdmin):
@@ -0,0 +1,227 @@
+"""JSON API лент только для чтения.
+
+Страницы листаются курсорами ``after``/``before`` тех же пагинаторов,
+что и HTML-ленты. ``?fields=`` ограничивает поля основных объектов,
+``?include=author,group`` добавляет связанные объекты в ``included``:
+по одному запросу ``in_bulk`` на тип, сколько бы постов ни было на
+странице.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET
+
+from .models import Comment, Group, Post, User
+from .paginators import FEED_ORDERING, CursorPaginator, MergingCursorPaginator
+from .timelines import FOLLOW_ORDERING, follow_posts, follow_sources
+
+COMMENT_ORDERING = ('created', 'id')
+
+
+def _image(post):
+    return post.image.url if post.image else None
+
+
+# Поле ответа -> (поле модели, значение).
+POST_FIELDS = {
+    'id': ('id', lambda post: post.pk),
+    'text': ('text', lambda post: post.text),
+    'pub_date': ('pub_date', lambda post: post.pub_date),
+    'author': ('author', lambda post: post.author_id),
+    'group': ('group', lambda post: post.group_id),
+    'image': ('image', _image),
+    'comments_count': ('comments_count', lambda post: post.comments_count),
+}
+COMMENT_FIELDS = {
+    'id': ('id', lambda comment: comment.pk),
+    'post': ('post', lambda comment: comment.post_id),
+    'author': ('author', lambda comment: comment.author_id),
+    'text': ('text', lambda comment: comment.text),
+    'created': ('created', lambda comment: comment.created),
+}
+AUTHOR_FIELDS = ('id', 'username', 'first_name', 'last_name')
+GROUP_FIELDS = ('id', 'slug', 'title', 'description')
+# Включаемый тип -> (модель, поля, атрибут с id у основного объекта).
+INCLUDES = {
+    'author': (User, AUTHOR_FIELDS, 'author_id'),
+    'group': (Group, GROUP_FIELDS, 'group_id'),
+}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def _names(request, name, allowed, default):
+    value = request.GET.get(name)
+    if value is None:
+        return list(default)
+    names = [item for item in value.split(',') if item]
+    unknown = sorted(set(names) - set(allowed))
+    if unknown:
+        raise BadRequest(f'{name}: неизвестные значения {", ".join(unknown)}')
+    return names
+
+
+def _limit(request):
+    value = request.GET.get('limit')
+    if value is None:
+        return settings.PAGINATOR_ITEMS_ON_PAGE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise BadRequest('limit: нужно целое число') from None
+    if not 1 <= limit <= settings.API_MAX_PAGE_SIZE:
+        raise BadRequest(f'limit: от 1 до {settings.API_MAX_PAGE_SIZE}')
+    return limit
+
+
+class Resource:
+    """Разбор ``fields`` и ``include`` и сборка ответа для одного типа."""
+
+    def __init__(self, request, fields, includes):
+        self.fields = _names(request, 'fields', fields, fields)
+        self.includes = _names(request, 'include', includes, ())
+        self.serializers = {name: fields[name][1] for name in self.fields}
+        self.columns = {fields[name][0] for name in self.fields}
+        self.columns.add('id')
+        for name in self.includes:
+            self.columns.add(name)
+
+    def restrict(self, queryset, keys=()):
+        """Выбирает из БД только нужные ответу поля и ключи сортировки."""
+        model_fields = {
+            field.name for field in queryset.model._meta.concrete_fields
+        }
+        return queryset.only(
+            *self.columns, *(key for key in keys if key in model_fields)
+        )
+
+    def serialize(self, obj):
+        return {
+            name: serializer(obj)
+            for name, serializer in self.serializers.items()
+        }
+
+    def included(self, objects):
+        included = {}
+        for name in self.includes:
+            model, fields, attribute = INCLUDES[name]
+            ids = {getattr(obj, attribute) for obj in objects} - {None}
+            found = model.objects.only(*fields).in_bulk(ids) if ids else {}
+            included[name] = [
+                {field: getattr(found[pk], field) for field in fields}
+                for pk in sorted(found)
+            ]
+        return included
+
+    def page_response(self, objects, **cursors):
+        return JsonResponse({
+            'data': [self.serialize(obj) for obj in objects],
+            'included': self.included(objects),
+            **cursors,
+        })
+
+    def object_response(self, obj):
+        return JsonResponse({
+            'data': self.serialize(obj),
+            'included': self.included([obj]),
+        })
+
+
+def api_view(view):
+    """GET-представление, которое и об ошибках отвечает в JSON."""
+    @require_GET
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as bad_request:
+            return error(str(bad_request))
+        except Http404:
+            return error('Не найдено', status=404)
+    return wrapper
+
+
+def page(request, source, fields, includes, ordering):
+    """Страница ленты: ``source`` — queryset или источники ленты подписок."""
+    resource = Resource(request, fields, includes)
+    keys = [field.lstrip('-') for field in ordering]
+    options = {
+        'ordering': ordering,
+        'after': request.GET.get('after'),
+        'before': request.GET.get('before'),
+    }
+    if isinstance(source, list):
+        paginator = MergingCursorPaginator(
+            source,
+            _limit(request),
+            resource.restrict(follow_posts(Post.objects.all()), keys),
+            **options,
+        )
+    else:
+        paginator = CursorPaginator(
+            resource.restrict(source, keys), _limit(request), **options
+        )
+    return resource.page_response(
+        paginator.window[0],
+        next=paginator.next_cursor,
+        previous=paginator.previous_cursor,
+    )
+
+
+@api_view
+def index(request):
+    return page(
+        request, Post.objects.all(), POST_FIELDS, INCLUDES, FEED_ORDERING
+    )
+
+
+@api_view
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return page(
+        request, Post.objects.filter(group=group), POST_FIELDS, INCLUDES,
+        FEED_ORDERING,
+    )
+
+
+@api_view
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return page(
+        request, Post.objects.filter(author=author), POST_FIELDS, INCLUDES,
+        FEED_ORDERING,
+    )
+
+
+@api_view
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return error('Нужна авторизация', status=401)
+    return page(
+        request, follow_sources(Post.objects.all(), request.user),
+        POST_FIELDS, INCLUDES, FOLLOW_ORDERING,
+    )
+
+
+@api_view
+def post_detail(request, post_id):
+    resource = Resource(request, POST_FIELDS, INCLUDES)
+    post = get_object_or_404(resource.restrict(Post.objects.all()), id=post_id)
+    return resource.object_response(post)
+
+
+@api_view
+def comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    return page(
+        request, Comment.objects.filter(post=post), COMMENT_FIELDS,
+        {'author': INCLUDES['author']}, COMMENT_ORDERING,
+    )
@@ -0,0 +1,34 @@
+"""Пачки и файл состояния для долгих команд, которые можно продолжить.
+
+Используются ``import_posts`` и ``clean_media``.
+"""
+import itertools
+import json
+import os
+
+
+def chunks(iterable, size):
+    """Списки по ``size`` элементов; последний может быть короче."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def load_state(path):
+    """Сохранённое состояние или None, если файла нет."""
+    try:
+        with open(path) as source:
+            return json.load(source)
+    except FileNotFoundError:
+        return None
+
+
+def save_state(path, state):
+    """Пишет состояние через временный файл: обрыв не оставит его битым."""
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as target:
+        json.dump(state, target)
+    os.replace(temporary, path)
@@ -0,0 +1,212 @@
+"""Воспроизводимый набор данных и замеры представлений, см. команду
+``manage.py benchmark``."""
+import io
+import math
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from faker import Faker
+from mixer.backend.django import mixer
+from PIL import Image
+
+from .models import Comment, Follow, Group, Post, User
+from .sampling import zipf_weights
+
+START_DATE = datetime(2022, 1, 1, tzinfo=timezone.utc)
+IMAGES = 10
+BATCH_SIZE = 500
+
+
+def make_images():
+    """Несколько небольших картинок, общих для постов набора."""
+    names = []
+    for i in range(IMAGES):
+        name = f'posts/bench_{i}.jpg'
+        if not default_storage.exists(name):
+            buffer = io.BytesIO()
+            Image.new('RGB', (640, 480), (i * 25, 100, 200)).save(
+                buffer, 'JPEG'
+            )
+            default_storage.save(name, ContentFile(buffer.getvalue()))
+        names.append(name)
+    return names
+
+
+def build_dataset(seed=0, users=200, groups=10, posts=5000, comments=10000,
+                  follows=20, skew=1.1, image_ratio=0.3):
+    """Заполняет базу детерминированным набором данных.
+
+    Авторство постов, комментарии и подписки распределены по Ципфу
+    с показателем ``skew``: у немногих авторов большая часть постов
+    и подписчиков. Объекты строятся mixer без сохранения и пишутся
+    ``bulk_create``; счётчики, ленты и поисковый индекс затем
+    пересобираются командами обслуживания.
+    """
+    rng = random.Random(seed)
+    # Тексты берутся у своего экземпляра Faker: состояние генератора
+    # внутри mixer переживает вызовы, и повторная сборка дала бы другое.
+    fake = Faker()
+    fake.seed_instance(seed)
+    with mixer.ctx(commit=False):
+        User.objects.bulk_create(
+            (
+                mixer.blend(
+                    User,
+                    username=f'user{i}',
+                    password='!',
+                    first_name=fake.first_name(),
+                    last_name=fake.last_name(),
+                    email=fake.email(),
+                )
+                for i in range(users)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        Group.objects.bulk_create(
+            mixer.blend(
+                Group,
+                slug=f'group-{i}',
+                title=fake.sentence(nb_words=3),
+                description=fake.paragraph(),
+            )
+            for i in range(groups)
+        )
+        user_ids = list(
+            User.objects.order_by('id').values_list('id', flat=True)
+        )
+        group_ids = list(
+            Group.objects.order_by('id').values_list('id', flat=True)
+        )
+        authors = zipf_weights(len(user_ids), skew)
+        images = make_images()
+        Post.objects.bulk_create(
+            (
+                mixer.blend(
+                    Post,
+                    text=fake.paragraph(nb_sentences=5),
+                    author_id=rng.choices(user_ids, cum_weights=authors)[0],
+                    group_id=(
+                        rng.choice(group_ids) if rng.random() < 0.7 else None
+                    ),
+                    image=(
+                        rng.choice(images)
+                        if rng.random() < image_ratio else ''
+                    ),
+                )
+                for _ in range(posts)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+    post_ids = list(Post.objects.order_by('id').values_list('id', flat=True))
+    dated = [
+        Post(id=pk, pub_date=START_DATE + timedelta(minutes=i))
+        for i, pk in enumerate(post_ids)
+    ]
+    Post.objects.bulk_update(dated, ['pub_date'], batch_size=BATCH_SIZE)
+    popular = zipf_weights(len(post_ids), skew)
+    with mixer.ctx(commit=False):
+        Comment.objects.bulk_create(
+            (
+                mixer.blend(
+                    Comment,
+                    text=fake.sentence(),
+                    post_id=rng.choices(post_ids, cum_weights=popular)[0],
+                    author_id=rng.choice(user_ids),
+                )
+                for _ in range(comments)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+    edges = []
+    for user_id in user_ids:
+        wanted = min(follows, len(user_ids) - 1)
+        followed = set()
+        while len(followed) < wanted:
+            author_id = rng.choices(user_ids, cum_weights=authors)[0]
+            if author_id != user_id:
+                followed.add(author_id)
+        edges.extend(
+            Follow(user_id=user_id, author_id=author_id)
+            for author_id in sorted(followed)
+        )
+    Follow.objects.bulk_create(edges, batch_size=BATCH_SIZE)
+    for command in ('reconcile_counters', 'rebuild_timelines',
+                    'rebuild_search'):
+        call_command(command, stdout=io.StringIO())
+
+
+def targets():
+    """Адреса замеряемых представлений на самых нагруженных объектах."""
+    author = User.objects.order_by('-stats__posts_count', 'id').first()
+    reader = User.objects.order_by('-stats__following_count', 'id').first()
+    group = Group.objects.order_by('id').first()
+    post = Post.objects.order_by('-comments_count', 'id').first()
+    return reader, {
+        'index': reverse('posts:index'),
+        'group_posts': reverse(
+            'posts:group_list', kwargs={'slug': group.slug}
+        ),
+        'profile': reverse(
+            'posts:profile', kwargs={'username': author.username}
+        ),
+        'post_detail': reverse(
+            'posts:post_detail', kwargs={'post_id': post.id}
+        ),
+        'follow_index': reverse('posts:follow_index'),
+    }
+
+
+def percentile(values, share):
+    """Процентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(share * len(ordered)) - 1, 0)]
+
+
+def measure(client, url, repeat, cold):
+    """Время ответа и число запросов к БД за ``repeat`` запросов.
+
+    В холодном режиме кэш очищается перед каждым запросом.
+    """
+    client.get(url)
+    timings = []
+    queries = []
+    for _ in range(repeat):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f'{url}: HTTP {response.status_code}')
+        queries.append(len(captured))
+    return {
+        'p50_ms': round(percentile(timings, 0.5), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'queries': int(statistics.median(queries)),
+    }
+
+
+def run(repeat=50):
+    """Замеры всех представлений в холодном и тёплом режимах."""
+    reader, urls = targets()
+    client = Client(SERVER_NAME='localhost')
+    client.force_login(reader)
+    return {
+        name: {
+            mode: measure(client, url, repeat, cold=mode == 'cold')
+            for mode in ('cold', 'warm')
+        }
+        for name, url in urls.items()
+    }
@@ -0,0 +1,80 @@
+"""Счётчики ссылок на файлы картинок постов.
+
+Одинаковые картинки хранятся одним файлом (см. ``posts.storage``),
+поэтому файл удаляется вместе с миниатюрами, только когда на него
+не ссылается ни один пост.
+"""
+import logging
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from sorl.thumbnail import delete
+
+from .models import MediaBlob
+
+logger = logging.getLogger(__name__)
+
+
+def _by_delta(names):
+    groups = defaultdict(list)
+    for name, delta in Counter(names).items():
+        groups[delta].append(name)
+    return groups.items()
+
+
+def retain(names):
+    """Добавляет по ссылке на каждое непустое имя из ``names``."""
+    names = [name for name in names if name]
+    if not names:
+        return
+    MediaBlob.objects.bulk_create(
+        [MediaBlob(name=name) for name in set(names)],
+        ignore_conflicts=True,
+    )
+    for delta, group in _by_delta(names):
+        MediaBlob.objects.filter(name__in=group).update(
+            refs=F('refs') + delta
+        )
+
+
+def release(names):
+    """Снимает ссылки; файлы без ссылок удаляются после фиксации."""
+    names = [name for name in names if name]
+    if not names:
+        return
+    for delta, group in _by_delta(names):
+        MediaBlob.objects.filter(name__in=group, refs__gte=delta).update(
+            refs=F('refs') - delta
+        )
+    orphans = list(
+        MediaBlob.objects.filter(name__in=set(names), refs=0)
+        .values_list('name', flat=True)
+    )
+    if orphans:
+        MediaBlob.objects.filter(name__in=orphans, refs=0).delete()
+        transaction.on_commit(lambda: remove(orphans))
+
+
+def refs(name):
+    """Сколько постов ссылается на файл ``name``."""
+    return MediaBlob.objects.filter(name=name).values_list(
+        'refs', flat=True
+    ).first() or 0
+
+
+def remove(names):
+    """Удаляет файлы и их миниатюры, если на них снова не сослались.
+
+    Пока транзакция удаления шла, ту же картинку могли загрузить ещё
+    раз; такой файл остаётся на месте.
+    """
+    retained = set(
+        MediaBlob.objects.filter(name__in=names)
+        .values_list('name', flat=True)
+    )
+    for name in set(names) - retained:
+        try:
+            delete(name)
+        except Exception:
+            logger.exception('Не удалось удалить картинку %s', name)
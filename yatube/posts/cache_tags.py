@@ -0,0 +1,78 @@
+import time
+
+from django.core.cache import cache
+
+TAG_KEY = 'posts:tag:{}'
+INDEX_TAG = 'feed:index'
+
+
+def post_tag(post_id):
+    return f'post:{post_id}'
+
+
+def comments_tag(post_id):
+    """Комментарии поста и их число; карточки и ленты от них не зависят."""
+    return f'comments:{post_id}'
+
+
+def group_tag(group_id):
+    return f'group:{group_id}'
+
+
+def author_tag(author_id):
+    return f'author:{author_id}'
+
+
+def author_name_tag(author_id):
+    return f'author-name:{author_id}'
+
+
+def group_name_tag(group_id):
+    return f'group-name:{group_id}'
+
+
+def post_tags(post):
+    tags = [post_tag(post.pk), author_tag(post.author_id)]
+    if post.group_id is not None:
+        tags.append(group_tag(post.group_id))
+    return tags
+
+
+def article_tags(post):
+    """Теги карточки поста: сам пост, имя автора и название группы."""
+    tags = [post_tag(post.pk), author_name_tag(post.author_id)]
+    if post.group_id is not None:
+        tags.append(group_name_tag(post.group_id))
+    return tags
+
+
+def versions(tags):
+    """Текущие версии тегов.
+
+    Версия — время последней инвалидации. Тег, которого нет в кэше,
+    получает текущее время, поэтому записи, собранные до вытеснения
+    тега, считаются устаревшими.
+    """
+    keys = {TAG_KEY.format(tag): tag for tag in tags}
+    found = cache.get_many(list(keys))
+    missing = {key: time.time() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return {tag: found[key] for key, tag in keys.items()}
+
+
+def invalidate(*tags):
+    now = time.time()
+    cache.set_many({TAG_KEY.format(tag): now for tag in tags}, None)
+
+
+def get_fragment(key):
+    entry = cache.get(key)
+    if entry is None or versions(entry['tags']) != entry['tags']:
+        return None
+    return entry['html']
+
+
+def set_fragment(key, html, tag_versions, timeout):
+    cache.set(key, {'html': html, 'tags': tag_versions}, timeout)
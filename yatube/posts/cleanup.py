@@ -0,0 +1,197 @@
+"""Сборка мусора в media, см. ``manage.py clean_media``.
+
+Три прохода, каждый пачками:
+
+* ``sources`` — файлы картинок постов, на которые не ссылается ни один
+  пост, удаляются вместе с миниатюрами;
+* ``kvstore`` — записи sorl о несуществующих файлах и списки миниатюр
+  без исходника;
+* ``thumbnails`` — файлы миниатюр, о которых kvstore не знает.
+
+Дерево обходится через ``os.scandir`` в порядке путей, а записи kvstore
+идут по ключу, поэтому после каждой пачки позиция сохраняется, и
+прерванная сборка продолжается с неё. Файлы моложе ``min_age`` не
+трогаются: их могли записать, но ещё не зафиксировать пост или
+kvstore.
+"""
+import os
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from sorl.thumbnail import default, delete
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix, del_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from . import batches
+from .models import MediaBlob, Post
+
+PHASES = ('sources', 'kvstore', 'thumbnails')
+
+
+def walk(root, relative, after=()):
+    """Файлы под ``root/relative`` по возрастанию пути.
+
+    Каталог читается ``os.scandir`` и сортируется целиком только сам,
+    без подкаталогов. Всё до пути ``after`` (кортеж частей) включительно
+    пропускается, не заходя в уже пройденные каталоги.
+    """
+    try:
+        with os.scandir(os.path.join(root, relative)) as scanner:
+            entries = sorted(scanner, key=lambda entry: entry.name)
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        path = f'{relative}/{entry.name}'
+        parts = tuple(path.split('/'))
+        if entry.is_dir(follow_symlinks=False):
+            if parts >= after[:len(parts)]:
+                yield from walk(root, path, after)
+        elif entry.is_file(follow_symlinks=False) and parts > after:
+            yield path, entry
+
+
+def referenced(names):
+    """Имена из ``names``, на которые ссылаются посты."""
+    names = list(names)
+    return set(
+        Post.objects.filter(image__in=names).values_list('image', flat=True)
+    ) | set(
+        MediaBlob.objects.filter(name__in=names, refs__gt=0)
+        .values_list('name', flat=True)
+    )
+
+
+def exists(image_file):
+    try:
+        return image_file.exists()
+    except SuspiciousFileOperation:
+        return False
+
+
+class Throttle:
+    """Держит скорость обработки не выше ``rate`` объектов в секунду."""
+
+    def __init__(self, rate, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.clock = clock
+        self.sleep = sleep
+        self.started = clock()
+        self.done = 0
+
+    def __call__(self, count):
+        if not self.rate:
+            return
+        self.done += count
+        delay = self.done / self.rate - (self.clock() - self.started)
+        if delay > 0:
+            self.sleep(delay)
+
+
+class Collector:
+    def __init__(self, batch_size=500, rate=0, min_age=3600,
+                 dry_run=False):
+        self.batch_size = batch_size
+        self.throttle = Throttle(rate)
+        self.min_age = min_age
+        self.dry_run = dry_run
+        self.checked = Counter()
+        self.removed = Counter()
+
+    def run(self, state=None, on_batch=None):
+        """Проходит фазы с позиции ``state``.
+
+        ``on_batch`` получает новое состояние после каждой пачки.
+        """
+        state = state or {'phase': PHASES[0], 'after': ''}
+        self.cutoff = time.time() - self.min_age
+        for phase in PHASES[PHASES.index(state['phase']):]:
+            after = state['after'] if phase == state['phase'] else ''
+            for after, count in getattr(self, f'collect_{phase}')(after):
+                self.checked[phase] += count
+                if on_batch is not None:
+                    on_batch({'phase': phase, 'after': after})
+                self.throttle(count)
+
+    def files(self, top, after):
+        after = tuple(after.split('/')) if after else ()
+        return batches.chunks(
+            walk(settings.MEDIA_ROOT, top.strip('/'), after),
+            self.batch_size,
+        )
+
+    def old_enough(self, entry):
+        # Не entry.stat(): он кэширует ответ, а файл могли освежить
+        # после обхода каталога, см. ContentAddressedStorage.save.
+        return os.lstat(entry.path).st_mtime < self.cutoff
+
+    def collect_sources(self, after):
+        top = Post._meta.get_field('image').upload_to
+        for batch in self.files(top, after):
+            used = referenced(path for path, entry in batch)
+            for path, entry in batch:
+                if path not in used and self.old_enough(entry):
+                    self.removed['sources'] += 1
+                    if not self.dry_run:
+                        delete(path)
+            yield batch[-1][0], len(batch)
+
+    def collect_kvstore(self, after):
+        prefix = f'{thumbnail_settings.THUMBNAIL_KEY_PREFIX}||'
+        images = add_prefix('', 'image')
+        lists = add_prefix('', 'thumbnails')
+        while True:
+            rows = list(
+                KVStoreModel.objects.filter(key__startswith=prefix)
+                .filter(key__gt=after)
+                .order_by('key')
+                .values_list('key', 'value')[:self.batch_size]
+            )
+            if not rows:
+                return
+            sources = {
+                add_prefix(del_prefix(key)): key
+                for key, value in rows if key.startswith(lists)
+            }
+            known = set(
+                KVStoreModel.objects.filter(key__in=sources)
+                .values_list('key', flat=True)
+            )
+            for key, value in rows:
+                if key.startswith(images):
+                    image_file = deserialize_image_file(value)
+                    if exists(image_file):
+                        continue
+                    self.removed['kvstore'] += 1
+                    if not self.dry_run:
+                        default.kvstore.delete(image_file)
+                elif key.startswith(lists):
+                    if add_prefix(del_prefix(key)) in known:
+                        continue
+                    self.removed['kvstore'] += 1
+                    if not self.dry_run:
+                        default.kvstore._delete(
+                            del_prefix(key), identity='thumbnails'
+                        )
+            after = rows[-1][0]
+            yield after, len(rows)
+
+    def collect_thumbnails(self, after):
+        for batch in self.files(thumbnail_settings.THUMBNAIL_PREFIX, after):
+            keys = {
+                path: add_prefix(ImageFile(path, default.storage).key)
+                for path, entry in batch
+            }
+            known = set(
+                KVStoreModel.objects.filter(key__in=keys.values())
+                .values_list('key', flat=True)
+            )
+            for path, entry in batch:
+                if keys[path] not in known and self.old_enough(entry):
+                    self.removed['thumbnails'] += 1
+                    if not self.dry_run:
+                        default.storage.delete(path)
+            yield batch[-1][0], len(batch)
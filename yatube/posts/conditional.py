@@ -0,0 +1,128 @@
+"""Условные GET для страниц поста, группы и автора.
+
+Валидаторы страницы — версии её тегов из ``cache_tags``: время
+последней инвалидации и есть время изменения. Объект страницы
+находится одним запросом по индексу, версии — одним ``get_many``
+кэша, и если у клиента та же версия, 304 уходит до запросов ленты,
+комментариев и шаблонов.
+"""
+import hashlib
+import json
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.http import Http404
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from . import cache_tags, feeds
+from .models import Group, Post, User
+
+
+def post_page(post_id):
+    return feeds.feed_posts().select_related('author__stats').filter(
+        id=post_id
+    ).first()
+
+
+def post_page_tags(post):
+    # Группа на странице поста — только название.
+    tags = [
+        cache_tags.post_tag(post.pk),
+        cache_tags.comments_tag(post.pk),
+        cache_tags.author_tag(post.author_id),
+    ]
+    if post.group_id is not None:
+        tags.append(cache_tags.group_name_tag(post.group_id))
+    return tags
+
+
+def comments_page(post_id):
+    return Post.objects.only('id', 'comments_count').filter(
+        id=post_id
+    ).first()
+
+
+def comments_page_tags(post):
+    return [cache_tags.comments_tag(post.pk)]
+
+
+def group_page(slug):
+    return Group.objects.filter(slug=slug).first()
+
+
+def group_page_tags(group):
+    return [cache_tags.group_tag(group.pk)]
+
+
+def profile_page(username):
+    return User.objects.select_related('stats').filter(
+        username=username
+    ).first()
+
+
+def profile_page_tags(author):
+    return [cache_tags.author_tag(author.pk)]
+
+
+def _page_versions(request, lookup, page_tags, kwargs):
+    """Версии тегов страницы, один раз на запрос; None — страницы нет."""
+    if not hasattr(request, '_page_versions'):
+        request.page_object = lookup(**kwargs)
+        request._page_versions = None
+        if request.page_object is not None:
+            request._page_versions = cache_tags.versions(
+                page_tags(request.page_object)
+            )
+    return request._page_versions
+
+
+def page_object(request):
+    """Объект страницы, найденный для валидаторов, или 404."""
+    if request.page_object is None:
+        raise Http404
+    return request.page_object
+
+
+def tagged_page(lookup, page_tags):
+    """ETag и Last-Modified страницы по версиям тегов её объекта.
+
+    ``lookup`` получает аргументы представления и находит объект
+    страницы, ``page_tags`` — теги этого объекта. Представление берёт
+    найденный объект через ``page_object``, а не ищет его снова.
+
+    В ETag входят адрес с курсором, пользователь и CSRF-токен: разметка
+    зависит от того, кто смотрит, а формы страницы несут токен, который
+    меняется при каждом входе. Ответы помечаются ``private, no-cache``,
+    чтобы браузер каждый раз переспрашивал, а общий кэш не хранил
+    чужую страницу.
+    """
+    def etag(request, **kwargs):
+        versions = _page_versions(request, lookup, page_tags, kwargs)
+        if versions is None:
+            return None
+        data = json.dumps([
+            request.get_full_path(),
+            request.user.pk if request.user.is_authenticated else None,
+            request.META.get('CSRF_COOKIE'),
+            sorted(versions.items()),
+        ])
+        return hashlib.md5(data.encode()).hexdigest()
+
+    def last_modified(request, **kwargs):
+        versions = _page_versions(request, lookup, page_tags, kwargs)
+        if versions is None:
+            return None
+        return datetime.fromtimestamp(max(versions.values()), timezone.utc)
+
+    def decorator(view):
+        conditional_view = condition(etag, last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if response.has_header('ETag'):
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
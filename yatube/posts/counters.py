@@ -0,0 +1,58 @@
+from collections import defaultdict
+
+from django.db.models import F
+
+from .models import Post, UserStats
+
+
+def shift_user(user_id, **deltas):
+    """Атомарно сдвигает счётчики пользователя через F()-выражения.
+
+    Строка счётчиков создаётся вместе с пользователем; если её нет, она
+    заводится только при росте счётчика, чтобы не воскрешать статистику
+    пользователя, которого сейчас каскадно удаляют.
+    """
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if UserStats.objects.filter(user_id=user_id).update(**changes):
+        return
+    if all(delta > 0 for delta in deltas.values()):
+        UserStats.objects.get_or_create(user_id=user_id)
+        UserStats.objects.filter(user_id=user_id).update(**changes)
+
+
+def shift_users(field, deltas):
+    """Сдвигает счётчик ``field`` многим пользователям сразу.
+
+    ``deltas`` — словарь id пользователя -> сдвиг. Один UPDATE на
+    каждое различное значение сдвига; недостающие строки счётчиков
+    заводятся заранее.
+    """
+    existing = set(
+        UserStats.objects.filter(user_id__in=deltas)
+        .values_list('user_id', flat=True)
+    )
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=user_id) for user_id in deltas
+         if user_id not in existing],
+        ignore_conflicts=True,
+    )
+    users = defaultdict(list)
+    for user_id, delta in deltas.items():
+        users[delta].append(user_id)
+    for delta, ids in users.items():
+        UserStats.objects.filter(user_id__in=ids).update(
+            **{field: F(field) + delta}
+        )
+
+
+def shift_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta
+    )
+
+
+def stats_for(user):
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return UserStats.objects.get_or_create(user=user)[0]
@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+
+from .models import UserStats
+
+KEY = 'posts:count:{}'
+MANY_KEY = 'posts:count:{}:many'
+
+
+def global_scope():
+    return 'all'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def post_scopes(post):
+    scopes = [global_scope()]
+    if post.group_id is not None:
+        scopes.append(group_scope(post.group_id))
+    return scopes
+
+
+def bounded_count(posts):
+    """Считает не дальше PAGINATOR_EXACT_COUNT_LIMIT строк.
+
+    Возвращает пару (число, точное ли оно): если строк больше предела,
+    вместо полного COUNT(*) отдаётся оценка «много».
+    """
+    limit = settings.PAGINATOR_EXACT_COUNT_LIMIT
+    count = posts.order_by()[:limit + 1].count()
+    if count > limit:
+        return limit, False
+    return count, True
+
+
+def scope_count(scope, posts):
+    key, many_key = KEY.format(scope), MANY_KEY.format(scope)
+    cached = cache.get_many([key, many_key])
+    if key in cached:
+        return cached[key], True
+    if many_key in cached:
+        return settings.PAGINATOR_EXACT_COUNT_LIMIT, False
+    count, exact = bounded_count(posts)
+    cache.set(
+        key if exact else many_key,
+        count if exact else True,
+        settings.POST_COUNT_CACHE_TIMEOUT,
+    )
+    return count, exact
+
+
+def follow_count(user):
+    """Размер ленты подписок — сумма счётчиков постов авторов.
+
+    Отдельный счётчик на подписчика пришлось бы менять у всех подписчиков
+    при каждой публикации, поэтому он собирается из UserStats авторов.
+    """
+    total = UserStats.objects.filter(
+        user__following__user=user
+    ).aggregate(total=Sum('posts_count'))['total'] or 0
+    limit = settings.PAGINATOR_EXACT_COUNT_LIMIT
+    return (total, True) if total <= limit else (limit, False)
+
+
+def scope_counter(scope):
+    return lambda posts: scope_count(scope, posts)
+
+
+def follow_counter(user):
+    return lambda posts: follow_count(user)
+
+
+def stats_counter(stats):
+    return lambda posts: (stats.posts_count, True)
+
+
+def forget(scopes):
+    """Удаляет закэшированные счётчики; они посчитаются заново."""
+    cache.delete_many([
+        key.format(scope) for scope in scopes for key in (KEY, MANY_KEY)
+    ])
+
+
+def shift(scopes, delta):
+    """Сдвигает закэшированные счётчики; отсутствующие посчитаются заново."""
+    for scope in scopes:
+        try:
+            cache.incr(KEY.format(scope), delta)
+        except ValueError:
+            pass
@@ -0,0 +1,109 @@
+"""Потоковая выгрузка постов и комментариев в JSONL и CSV.
+
+Строки читаются пачками по первичному ключу, каждая пачка —
+``.iterator()`` по значениям без моделей, так что память не зависит
+от числа постов автора. Поля постов совпадают с форматом
+``manage.py import_posts``: выгрузку можно загрузить обратно.
+"""
+import csv
+import json
+
+from .models import Comment, Post
+
+FORMATS = ('jsonl', 'csv')
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+# Имя в выгрузке -> поле для values().
+POST_FIELDS = {
+    'id': 'id',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'image': 'image',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+KINDS = {
+    'posts': (Post, POST_FIELDS),
+    'comments': (Comment, COMMENT_FIELDS),
+}
+
+
+class Echo:
+    """Файл для csv.writer, который просто возвращает строку."""
+
+    def write(self, value):
+        return value
+
+
+def keyset(queryset, fields, batch_size):
+    """Строки ``values(*fields)`` по возрастанию pk пачками по ключу.
+
+    Каждая пачка начинается с условия pk > последнего, а не со
+    смещения, поэтому глубина выгрузки не замедляет запросы.
+    """
+    last = 0
+    while True:
+        count = 0
+        batch = (
+            queryset.filter(pk__gt=last)
+            .order_by('pk')
+            .values('pk', *fields)[:batch_size]
+        )
+        for row in batch.iterator(chunk_size=batch_size):
+            last = row.pop('pk')
+            count += 1
+            yield row
+        if count < batch_size:
+            return
+
+
+def rows(kind, queryset, batch_size=1000):
+    """Словари с именами полей выгрузки для постов или комментариев."""
+    fields = KINDS[kind][1]
+    for row in keyset(queryset, fields.values(), batch_size):
+        yield {
+            name: _plain(row[field]) for name, field in fields.items()
+        }
+
+
+def _plain(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def render(kind, rows, format):
+    """Строки выгрузки в формате ``format`` по одной записи."""
+    if format == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(KINDS[kind][1])
+        for row in rows:
+            yield writer.writerow(
+                '' if value is None else value for value in row.values()
+            )
+        return
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def author_querysets(author):
+    return {
+        'posts': Post.objects.filter(author=author),
+        'comments': Comment.objects.filter(author=author),
+    }
+
+
+def group_querysets(group):
+    return {
+        'posts': Post.objects.filter(group=group),
+        'comments': Comment.objects.filter(post__group=group),
+    }
@@ -0,0 +1,90 @@
+from django.conf import settings
+
+from .counts import bounded_count
+from . import fulltext
+from .models import Comment, Post
+from .paginators import (
+    FEED_ORDERING, CursorPaginator, MergingCursorPaginator,
+)
+from .timelines import FOLLOW_ORDERING, follow_posts, follow_sources
+
+COMMENT_ORDERING = ('-created', '-id')
+
+
+def feed_posts():
+    """Посты вместе с автором и группой, которые выводит article.html."""
+    return Post.objects.select_related('author', 'group')
+
+
+def index_feed():
+    return feed_posts()
+
+
+def group_feed(group):
+    return feed_posts().filter(group=group)
+
+
+def author_feed(author):
+    return feed_posts().filter(author=author)
+
+
+def follow_feed(user):
+    return follow_sources(feed_posts(), user)
+
+
+def search_page(request, text):
+    """Страница поиска: из индекса FTS5, а без него — фильтром по тексту."""
+    if not fulltext.available():
+        return paginate(
+            request,
+            fulltext.search_posts(feed_posts(), text),
+            ordering=FEED_ORDERING,
+        )
+    paginator = fulltext.SearchPaginator(
+        text,
+        feed_posts(),
+        settings.PAGINATOR_ITEMS_ON_PAGE,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    return paginator.get_page()
+
+
+def paginate(request, posts, counter=bounded_count, ordering=FEED_ORDERING):
+    """``posts`` — queryset ленты или список источников ленты подписок."""
+    cursors = {
+        'after': request.GET.get('after'),
+        'before': request.GET.get('before'),
+        'counter': counter,
+    }
+    if isinstance(posts, list):
+        paginator = MergingCursorPaginator(
+            posts,
+            settings.PAGINATOR_ITEMS_ON_PAGE,
+            follow_posts(feed_posts()),
+            ordering=FOLLOW_ORDERING,
+            **cursors,
+        )
+    else:
+        paginator = CursorPaginator(
+            posts,
+            settings.PAGINATOR_ITEMS_ON_PAGE,
+            ordering=ordering,
+            **cursors,
+        )
+    return paginator.get_page()
+
+
+def comments_page(request, post):
+    """Страница комментариев поста, новые сверху, с авторами в том же запросе.
+
+    Общее число берётся из ``post.comments_count``, а не через COUNT.
+    """
+    paginator = CursorPaginator(
+        Comment.objects.filter(post=post).select_related('author'),
+        settings.COMMENTS_ON_PAGE,
+        ordering=COMMENT_ORDERING,
+        after=request.GET.get('after'),
+        counter=lambda comments: (post.comments_count, True),
+    )
+    return paginator.get_page()
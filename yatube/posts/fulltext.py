@@ -0,0 +1,188 @@
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import FloatField
+
+from .counts import bounded_count
+from .models import Post
+from .paginators import CursorPaginator
+
+TABLE = 'posts_post_search'
+SEARCH_ORDERING = ('search_rank', 'id')
+MAX_TERMS = 10
+
+
+def available():
+    """Индекс FTS5 есть только в SQLite, см. миграцию 0016_search."""
+    return connection.vendor == 'sqlite'
+
+
+def terms(text):
+    return re.findall(r'\w+', text.lower())[:MAX_TERMS]
+
+
+def match_query(text):
+    """Запрос FTS5 из слов строки.
+
+    Каждое слово берётся в кавычки, поэтому операторы FTS5 из ввода
+    пользователя не интерпретируются.
+    """
+    return ' '.join(f'"{term}"' for term in terms(text))
+
+
+def search_posts(posts, text):
+    """Посты, где есть все слова запроса, без ранжирования.
+
+    Для админки и баз без FTS5; ленту поиска выбирает ``SearchPaginator``.
+    """
+    query = match_query(text)
+    if not query:
+        return posts.none()
+    if not available():
+        for term in terms(text):
+            posts = posts.filter(text__icontains=term)
+        return posts
+    table = Post._meta.db_table
+    # RawSQL в __in оборачивается в лишние скобки, и SQLite берёт из
+    # подзапроса только первую строку, поэтому условие задано через extra.
+    return posts.extra(
+        where=[
+            f'{table}.id IN (SELECT rowid FROM {TABLE} '
+            f'WHERE {TABLE} MATCH %s)'
+        ],
+        params=[query],
+    )
+
+
+def ranked(text, cursor=None, backwards=False, limit=None):
+    """Пары (id, ранг) из индекса по возрастанию ранга, затем id.
+
+    ``cursor`` — пара (ранг, id), после которой, а при ``backwards`` —
+    до которой берутся строки; тогда они идут в обратном порядке.
+    """
+    query = match_query(text)
+    if not query:
+        return []
+    sql = f'SELECT rowid, rank FROM {TABLE} WHERE {TABLE} MATCH %s'
+    params = [query]
+    if cursor is not None:
+        sql += f' AND (rank, rowid) {"<" if backwards else ">"} (%s, %s)'
+        params += list(cursor)
+    direction = ' DESC' if backwards else ''
+    sql += f' ORDER BY rank{direction}, rowid{direction} LIMIT %s'
+    params.append(-1 if limit is None else limit)
+    with connection.cursor() as db:
+        db.execute(sql, params)
+        return db.fetchall()
+
+
+class SearchPaginator(CursorPaginator):
+    """Курсорный пагинатор поиска, который выбирает страницу из FTS5.
+
+    Индекс сам отдаёт ``per_page + 1`` строк по рангу, без подзапроса
+    на каждый пост, а посты страницы загружаются одним ``in_bulk``.
+    Ранг bm25: чем меньше, тем релевантнее.
+    """
+
+    def __init__(self, text, posts, per_page, **kwargs):
+        self.text = text
+        kwargs.setdefault('counter', counter(text))
+        super().__init__(posts, per_page, ordering=SEARCH_ORDERING, **kwargs)
+
+    def _key_field(self, name):
+        if name == 'search_rank':
+            return FloatField()
+        return super()._key_field(name)
+
+    def _fetch(self, posts, ordering, condition):
+        backwards = self.before is not None
+        rows = ranked(
+            self.text,
+            self.before if backwards else self.after,
+            backwards,
+            self.per_page + 1,
+        )
+        found = posts.in_bulk([pk for pk, rank in rows])
+        items = []
+        for pk, rank in rows:
+            if pk in found:
+                found[pk].search_rank = rank
+                items.append(found[pk])
+        return items
+
+
+def match_count(text):
+    """Число совпадений по индексу, не дальше PAGINATOR_EXACT_COUNT_LIMIT."""
+    limit = settings.PAGINATOR_EXACT_COUNT_LIMIT
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT COUNT(*) FROM (SELECT 1 FROM {TABLE} '
+            f'WHERE {TABLE} MATCH %s LIMIT %s)',
+            [match_query(text), limit + 1],
+        )
+        count = cursor.fetchone()[0]
+    return (count, True) if count <= limit else (limit, False)
+
+
+def counter(text):
+    if not available():
+        return bounded_count
+    return lambda posts: match_count(text)
+
+
+def index_post(post):
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post.pk])
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text) VALUES (%s, %s)',
+            [post.pk, post.text],
+        )
+
+
+def index_posts(posts):
+    """Добавляет в индекс новые посты из ``posts``, ещё не проиндексированные.
+
+    Одним INSERT … SELECT: тексты не проходят через Python.
+    """
+    if not available():
+        return
+    query = posts.order_by().values_list('id', 'text').query
+    sql, params = query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {TABLE} (rowid, text) {sql}', params)
+
+
+def remove_post(post_id):
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post_id])
+
+
+def rebuild(batch_size):
+    """Заново заполняет индекс из Post пачками по id; возвращает их число."""
+    if not available():
+        return 0
+    total = 0
+    last = 0
+    # Одна транзакция: поиск до фиксации видит старый индекс целиком,
+    # а оборванная перестройка не оставляет его пустым.
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        while True:
+            batch = list(
+                Post.objects.filter(id__gt=last)
+                .order_by('id')
+                .values_list('id', 'text')[:batch_size]
+            )
+            if not batch:
+                break
+            cursor.executemany(
+                f'INSERT INTO {TABLE} (rowid, text) VALUES (%s, %s)', batch
+            )
+            total += len(batch)
+            last = batch[-1][0]
+    return total
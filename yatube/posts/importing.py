@@ -0,0 +1,231 @@
+"""Потоковый импорт постов из JSONL и CSV, см. ``manage.py import_posts``.
+
+Записи читаются по одной и собираются в пачки, так что память не
+зависит от размера файла. Авторы и группы ищутся одним запросом на
+пачку и запоминаются. Пачка пишется ``bulk_create`` в своей
+транзакции вместе со счётчиками авторов, записями лент подписчиков и
+поисковым индексом только для своих постов; после фиксации номер
+последней записи сохраняется в файл состояния, и прерванный импорт
+продолжается со следующей пачки.
+"""
+import csv
+import itertools
+import json
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import batches, blobs, cache_tags, counters, counts, fulltext, timelines
+from .models import Group, Post, User
+
+FORMATS = ('jsonl', 'csv')
+
+
+class RecordError(ValueError):
+    """Запись, которую нельзя разобрать."""
+
+
+def read_records(stream, format, skip=0):
+    """Записи из потока по одной; первые ``skip`` записей пропускаются.
+
+    Пропущенные строки JSONL не разбираются, поэтому продолжение
+    импорта не тратит время на уже загруженную часть.
+    """
+    if format == 'csv':
+        yield from itertools.islice(csv.DictReader(stream), skip, None)
+        return
+    lines = (
+        (number, line)
+        for number, line in enumerate(stream, 1)
+        if line.strip()
+    )
+    for number, line in itertools.islice(lines, skip, None):
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            raise RecordError(f'строка {number}: {error}') from error
+        if not isinstance(record, dict):
+            raise RecordError(f'строка {number}: ожидался объект JSON')
+        yield record
+
+
+@contextmanager
+def explicit_dates():
+    """Даёт ``bulk_create`` записать pub_date из файла.
+
+    С auto_now_add поле само ставит текущее время при вставке. Флаг
+    снимается на уровне модели, поэтому так можно делать только
+    в отдельном процессе команды, а не в работающем сайте.
+    """
+    field = Post._meta.get_field('pub_date')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Importer:
+    def __init__(self, batch_size=1000, images_dir=None, image_workers=4,
+                 create_authors=False, index=True):
+        self.batch_size = batch_size
+        self.index = index
+        self.images_dir = images_dir
+        self.image_workers = image_workers
+        self.create_authors = create_authors
+        self.authors = {}
+        self.groups = {}
+        self.skipped = Counter()
+
+    def run(self, records, committed=0, on_commit=None):
+        """Импортирует записи; возвращает число созданных постов.
+
+        ``committed`` — сколько записей уже загружено прошлыми запусками,
+        ``on_commit`` получает новое значение после каждой пачки.
+        """
+        created = 0
+        with explicit_dates(), ThreadPoolExecutor(
+            max_workers=self.image_workers,
+            thread_name_prefix='import-images',
+        ) as pool:
+            for batch in batches.chunks(records, self.batch_size):
+                created += self.import_batch(batch, pool)
+                committed += len(batch)
+                if on_commit is not None:
+                    on_commit(committed)
+        return created
+
+    def import_batch(self, batch, pool):
+        self.resolve(batch)
+        posts = [
+            post for post in map(self.build, batch) if post is not None
+        ]
+        if self.images_dir:
+            sources = [post.image.name for post in posts]
+            for post, image in zip(
+                posts, pool.map(self.copy_image, sources)
+            ):
+                if image is None:
+                    self.skipped['image'] += 1
+                post.image = image or ''
+        with transaction.atomic():
+            # bulk_create в SQLite не возвращает id, а новые посты пачки —
+            # это всё, что после последнего id до вставки.
+            last_id = Post.objects.aggregate(last=Max('id'))['last'] or 0
+            Post.objects.bulk_create(posts)
+            blobs.retain(post.image.name for post in posts)
+            counters.shift_users(
+                'posts_count', Counter(post.author_id for post in posts)
+            )
+            if self.index:
+                created = Post.objects.filter(id__gt=last_id)
+                timelines.fan_out_posts(created)
+                fulltext.index_posts(created)
+            transaction.on_commit(lambda: self.invalidate(posts))
+        return len(posts)
+
+    def invalidate(self, posts):
+        scopes = Counter(
+            scope for post in posts for scope in counts.post_scopes(post)
+        )
+        for scope, total in scopes.items():
+            counts.shift([scope], total)
+        tags = {cache_tags.INDEX_TAG}
+        for post in posts:
+            tags.add(cache_tags.author_tag(post.author_id))
+            if post.group_id is not None:
+                tags.add(cache_tags.group_tag(post.group_id))
+        cache_tags.invalidate(*tags)
+
+    def resolve(self, batch):
+        """Находит id новых для импорта авторов и групп одним запросом.
+
+        Ненайденные запоминаются как None, чтобы не искать их снова.
+        """
+        usernames = {
+            record.get('author') for record in batch
+        } - self.authors.keys() - {None, ''}
+        if usernames:
+            self.authors.update(dict.fromkeys(usernames))
+            self.authors.update(
+                User.objects.filter(username__in=usernames)
+                .values_list('username', 'id')
+            )
+            missing = {
+                username for username in usernames
+                if self.authors[username] is None
+            }
+            if missing and self.create_authors:
+                User.objects.bulk_create(
+                    User(username=username, password=make_password(None))
+                    for username in sorted(missing)
+                )
+                self.authors.update(
+                    User.objects.filter(username__in=missing)
+                    .values_list('username', 'id')
+                )
+        slugs = {
+            record.get('group') for record in batch
+        } - self.groups.keys() - {None, ''}
+        if slugs:
+            self.groups.update(dict.fromkeys(slugs))
+            self.groups.update(
+                Group.objects.filter(slug__in=slugs).values_list('slug', 'id')
+            )
+
+    def build(self, record):
+        """Пост из записи или None, если запись пропускается."""
+        text = (record.get('text') or '').strip()
+        if not text:
+            self.skipped['text'] += 1
+            return None
+        author_id = self.authors.get(record.get('author'))
+        if author_id is None:
+            self.skipped['author'] += 1
+            return None
+        group_id = None
+        if record.get('group'):
+            group_id = self.groups.get(record['group'])
+            if group_id is None:
+                self.skipped['group'] += 1
+                return None
+        pub_date = timezone.now()
+        if record.get('pub_date'):
+            try:
+                pub_date = parse_datetime(record['pub_date'])
+            except ValueError:
+                pub_date = None
+            if pub_date is None:
+                self.skipped['pub_date'] += 1
+                return None
+            if timezone.is_naive(pub_date):
+                pub_date = timezone.make_aware(pub_date, timezone.utc)
+        return Post(
+            text=text,
+            author_id=author_id,
+            group_id=group_id,
+            pub_date=pub_date,
+            image=record.get('image') or '',
+        )
+
+    def copy_image(self, name):
+        """Копирует картинку в MEDIA_ROOT/posts/; без файла — None."""
+        if not name:
+            return ''
+        try:
+            with open(os.path.join(self.images_dir, name), 'rb') as source:
+                field = Post._meta.get_field('image')
+                return field.storage.save(
+                    field.generate_filename(None, os.path.basename(name)),
+                    File(source),
+                )
+        except OSError:
+            return None
@@ -0,0 +1,90 @@
+import json
+import platform
+import shutil
+import tempfile
+from datetime import datetime
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from posts import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время ответа и число запросов основных страниц '
+        'на воспроизводимом наборе данных во временной базе'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--comments', type=int, default=10000)
+        parser.add_argument('--follows', type=int, default=20)
+        parser.add_argument('--skew', type=float, default=1.1)
+        parser.add_argument('--image-ratio', type=float, default=0.3)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument(
+            '--compare',
+            help='JSON прошлого запуска, с которым сравнить p50 и p95',
+        )
+
+    def handle(self, *args, **options):
+        dataset = {
+            name: options[name]
+            for name in ('seed', 'users', 'groups', 'posts', 'comments',
+                         'follows', 'skew', 'image_ratio')
+        }
+        media_root = tempfile.mkdtemp()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            # Без DEBUG запросы не копятся в connection.queries, а время
+            # ответа ближе к боевому.
+            with override_settings(MEDIA_ROOT=media_root, DEBUG=False):
+                benchmarks.build_dataset(**dataset)
+                results = benchmarks.run(options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(media_root, ignore_errors=True)
+        report = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'dataset': dataset,
+            'repeat': options['repeat'],
+            'results': results,
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2, ensure_ascii=False)
+        previous = None
+        if options['compare']:
+            with open(options['compare']) as source:
+                previous = json.load(source)['results']
+        self.print_table(results, previous)
+        self.stdout.write(f'Результаты записаны в {options["output"]}')
+
+    def print_table(self, results, previous):
+        self.stdout.write(
+            f'{"страница":<14}{"режим":<7}{"p50, мс":>10}{"p95, мс":>10}'
+            f'{"запросов":>10}'
+        )
+        for name, modes in results.items():
+            for mode, result in modes.items():
+                line = (
+                    f'{name:<14}{mode:<7}{result["p50_ms"]:>10.2f}'
+                    f'{result["p95_ms"]:>10.2f}{result["queries"]:>10}'
+                )
+                before = (previous or {}).get(name, {}).get(mode)
+                if before:
+                    line += '  p50 {:+.1%}, p95 {:+.1%}'.format(
+                        result['p50_ms'] / before['p50_ms'] - 1,
+                        result['p95_ms'] / before['p95_ms'] - 1,
+                    )
+                self.stdout.write(line)
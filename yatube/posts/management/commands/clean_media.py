@@ -0,0 +1,65 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import batches, cleanup
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки без постов, устаревшие записи kvstore sorl '
+        'и миниатюры без записей; можно запускать на живом сайте'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--rate', type=float, default=1000,
+            help='Не больше стольких файлов и записей в секунду; 0 — без '
+                 'ограничения',
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=60 * 60,
+            help='Не трогать файлы моложе стольких секунд',
+        )
+        parser.add_argument(
+            '--state',
+            help='Файл состояния; по умолчанию MEDIA_ROOT/.clean_media.state',
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить с места, где остановился прошлый запуск',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать, что было бы удалено',
+        )
+
+    def handle(self, *args, **options):
+        state = options['state'] or os.path.join(
+            settings.MEDIA_ROOT, '.clean_media.state'
+        )
+        dry_run = options['dry_run']
+        collector = cleanup.Collector(
+            batch_size=options['batch_size'],
+            rate=options['rate'],
+            min_age=options['min_age'],
+            dry_run=dry_run,
+        )
+
+        def on_batch(position):
+            if not dry_run:
+                batches.save_state(state, position)
+
+        collector.run(
+            batches.load_state(state) if options['resume'] else None,
+            on_batch,
+        )
+        if not dry_run and os.path.exists(state):
+            os.remove(state)
+        for phase in cleanup.PHASES:
+            self.stdout.write(
+                f'{phase}: проверено {collector.checked[phase]}, '
+                f'удалено {collector.removed[phase]}'
+            )
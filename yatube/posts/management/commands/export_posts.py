@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import exporting
+from posts.models import Group, User
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты или комментарии автора или группы в JSONL/CSV'
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group()
+        source.add_argument('--author', help='Имя пользователя')
+        source.add_argument('--group', help='Slug группы')
+        parser.add_argument(
+            '--kind', choices=tuple(exporting.KINDS), default='posts'
+        )
+        parser.add_argument(
+            '--format', choices=exporting.FORMATS, default='jsonl'
+        )
+        parser.add_argument('--output', help='Файл; по умолчанию stdout')
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.EXPORT_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        if not (options['author'] or options['group']):
+            raise CommandError('Нужен --author или --group')
+        try:
+            if options['author']:
+                querysets = exporting.author_querysets(
+                    User.objects.get(username=options['author'])
+                )
+            else:
+                querysets = exporting.group_querysets(
+                    Group.objects.get(slug=options['group'])
+                )
+        except (User.DoesNotExist, Group.DoesNotExist) as error:
+            raise CommandError(error) from error
+        kind = options['kind']
+        lines = exporting.render(
+            kind,
+            exporting.rows(kind, querysets[kind], options['batch_size']),
+            options['format'],
+        )
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8',
+                  newline='') as output:
+            output.writelines(lines)
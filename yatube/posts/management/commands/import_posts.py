@@ -0,0 +1,86 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import batches, importing
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует посты из JSONL или CSV с полями author, text, group, '
+        'pub_date и image; «-» вместо файла читает stdin'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source')
+        parser.add_argument('--format', choices=importing.FORMATS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--images-dir',
+            help='Откуда копировать картинки; пути в image — от него',
+        )
+        parser.add_argument('--image-workers', type=int, default=4)
+        parser.add_argument(
+            '--create-authors', action='store_true',
+            help='Заводить неизвестных авторов без пароля',
+        )
+        parser.add_argument(
+            '--state',
+            help='Файл состояния; по умолчанию <source>.state',
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить с первой незафиксированной пачки',
+        )
+        parser.add_argument(
+            '--skip-index', action='store_true',
+            help='Не раскладывать посты по лентам и не добавлять в поиск; '
+                 'потом нужны rebuild_timelines и rebuild_search',
+        )
+
+    def handle(self, *args, **options):
+        source = options['source']
+        format = options['format'] or (
+            'csv' if source.endswith('.csv') else 'jsonl'
+        )
+        state = options['state']
+        if state is None and source != '-':
+            state = f'{source}.state'
+        saved = batches.load_state(state) if state else None
+        committed = saved['committed'] if saved else 0
+        if committed and not options['resume']:
+            raise CommandError(
+                f'Импорт уже загрузил {committed} записей, см. {state}; '
+                'продолжить можно с --resume'
+            )
+        importer = importing.Importer(
+            batch_size=options['batch_size'],
+            images_dir=options['images_dir'],
+            image_workers=options['image_workers'],
+            create_authors=options['create_authors'],
+            index=not options['skip_index'],
+        )
+
+        def on_commit(total):
+            if state:
+                batches.save_state(state, {'committed': total})
+            self.stdout.write(f'Зафиксировано записей: {total}')
+
+        stream = (
+            sys.stdin if source == '-'
+            else open(source, encoding='utf-8', newline='')
+        )
+        try:
+            created = importer.run(
+                importing.read_records(stream, format, committed),
+                committed,
+                on_commit,
+            )
+        except importing.RecordError as error:
+            raise CommandError(f'Импорт остановлен: {error}') from error
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        self.stdout.write(f'Создано постов: {created}')
+        for reason, total in sorted(importer.skipped.items()):
+            self.stdout.write(f'Пропущено из-за поля {reason}: {total}')
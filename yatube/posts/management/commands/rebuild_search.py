@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import fulltext
+
+
+class Command(BaseCommand):
+    help = 'Заново строит полнотекстовый индекс постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = fulltext.rebuild(options['batch_size'])
+        self.stdout.write(f'Проиндексировано постов: {total}')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts import timelines
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Раскладывает неразосланные посты по лентам подписчиков'
+
+    def handle(self, *args, **options):
+        authors = (
+            Post.objects.filter(fanned_out=False)
+            .order_by()
+            .values_list('author_id', flat=True)
+            .distinct()
+        )
+        total = 0
+        for author_id in authors.iterator():
+            total += timelines.fan_out_author(author_id)
+        self.stdout.write(f'Разослано постов: {total}')
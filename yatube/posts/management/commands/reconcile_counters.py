@@ -0,0 +1,87 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from posts.models import Comment, Follow, Post, User, UserStats
+
+USER_FIELDS = ('posts_count', 'followers_count', 'following_count')
+
+
+def grouped_count(queryset, field, ids):
+    return dict(
+        queryset.filter(**{f'{field}__in': ids})
+        .order_by()
+        .values_list(field)
+        .annotate(Count('pk'))
+    )
+
+
+def batches(queryset, size):
+    last = 0
+    while True:
+        ids = list(
+            queryset.filter(pk__gt=last)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:size]
+        )
+        if not ids:
+            return
+        yield ids
+        last = ids[-1]
+
+
+class Command(BaseCommand):
+    help = 'Сверяет денормализованные счётчики с данными и чинит расхождения'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        size = options['batch_size']
+        users = sum(
+            self.reconcile_users(ids) for ids in batches(User.objects, size)
+        )
+        posts = sum(
+            self.reconcile_posts(ids) for ids in batches(Post.objects, size)
+        )
+        self.stdout.write(
+            f'Исправлено счётчиков пользователей: {users}, постов: {posts}'
+        )
+
+    @transaction.atomic
+    def reconcile_users(self, ids):
+        posts = grouped_count(Post.objects, 'author_id', ids)
+        followers = grouped_count(Follow.objects, 'author_id', ids)
+        following = grouped_count(Follow.objects, 'user_id', ids)
+        stored = UserStats.objects.select_for_update().in_bulk(ids)
+        missing, drifted = [], []
+        for pk in ids:
+            actual = UserStats(
+                user_id=pk,
+                posts_count=posts.get(pk, 0),
+                followers_count=followers.get(pk, 0),
+                following_count=following.get(pk, 0),
+            )
+            if pk not in stored:
+                missing.append(actual)
+            elif any(
+                getattr(stored[pk], field) != getattr(actual, field)
+                for field in USER_FIELDS
+            ):
+                drifted.append(actual)
+        UserStats.objects.bulk_create(missing)
+        UserStats.objects.bulk_update(drifted, USER_FIELDS)
+        return len(missing) + len(drifted)
+
+    @transaction.atomic
+    def reconcile_posts(self, ids):
+        comments = grouped_count(Comment.objects, 'post_id', ids)
+        drifted = [
+            Post(pk=pk, comments_count=comments.get(pk, 0))
+            for pk, stored in Post.objects.select_for_update()
+            .filter(pk__in=ids)
+            .values_list('pk', 'comments_count')
+            if stored != comments.get(pk, 0)
+        ]
+        Post.objects.bulk_update(drifted, ['comments_count'])
+        return len(drifted)
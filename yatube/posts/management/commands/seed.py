@@ -0,0 +1,98 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts.models import (
+    Comment, Follow, Group, Post, TimelineEntry, User,
+)
+from posts.seeding import Seeder
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=200000)
+        parser.add_argument('--comments', type=int, default=400000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Подписок на пользователя',
+        )
+        parser.add_argument('--author-skew', type=float, default=1.1)
+        parser.add_argument('--comment-skew', type=float, default=1.0)
+        parser.add_argument('--follow-skew', type=float, default=1.2)
+        parser.add_argument('--batch-size', type=int, default=50000)
+        parser.add_argument(
+            '--skip-rebuild', action='store_true',
+            help='Не пересчитывать счётчики, ленты и поисковый индекс',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite' and not connection.in_atomic_block:
+            # Данные синтетические: при сбое их проще сгенерировать заново,
+            # чем ждать fsync на каждой транзакции.
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA synchronous = OFF')
+        seeder = Seeder(options['seed'], options['batch_size'])
+        started = time.perf_counter()
+        models = (User, Group, Post, Comment, Follow, TimelineEntry)
+        with seeder.bulk_load(*models):
+            created = self.fill(seeder, options)
+        seeder.forget_caches(*created)
+        self.stdout.write(
+            f'Всего с индексами: {time.perf_counter() - started:.1f} с'
+        )
+        seeder.reset_sequences(*models)
+        if options['skip_rebuild']:
+            return
+        for command in ('reconcile_counters', 'rebuild_search'):
+            call_command(command, stdout=self.stdout)
+
+    def fill(self, seeder, options):
+        user_ids = self.timed('пользователей', options['users'], (
+            lambda: seeder.users(options['users'])
+        ))
+        group_ids = self.timed('групп', options['groups'], (
+            lambda: seeder.groups(options['groups'])
+        ))
+        post_ids = self.timed('постов', options['posts'], (
+            lambda: seeder.posts(
+                options['posts'], user_ids, group_ids,
+                options['author_skew'],
+            )
+        ))
+        self.timed('комментариев', options['comments'], (
+            lambda: seeder.comments(
+                options['comments'], post_ids, user_ids,
+                options['comment_skew'],
+            )
+        ))
+        follows = min(options['follows'], len(user_ids) - 1)
+        self.timed('подписок', follows * len(user_ids), (
+            lambda: seeder.follows(follows, user_ids, options['follow_skew'])
+        ))
+        if not options['skip_rebuild']:
+            self.timed('записей лент', None, seeder.timelines)
+        return user_ids, group_ids, post_ids
+
+    def timed(self, label, count, step):
+        """Выполняет шаг и печатает скорость; без ``count`` число строк
+        возвращает сам шаг."""
+        started = time.perf_counter()
+        result = step()
+        elapsed = time.perf_counter() - started
+        if count is None:
+            count = result
+        self.stdout.write(
+            f'Создано {label}: {count} за {elapsed:.1f} с '
+            f'({count / max(elapsed, 1e-9):,.0f} строк/с)'
+        )
+        return result
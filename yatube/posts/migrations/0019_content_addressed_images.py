@@ -0,0 +1,38 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:21
+
+from django.db import migrations, models
+from django.db.models import Count
+import posts.storage
+
+
+def count_refs(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    MediaBlob = apps.get_model('posts', 'MediaBlob')
+    MediaBlob.objects.bulk_create(
+        MediaBlob(name=row['image'], refs=row['refs'])
+        for row in Post.objects.exclude(image='').order_by()
+        .values('image').annotate(refs=Count('pk'))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_comment_cursor_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('refs', models.PositiveIntegerField(default=0, verbose_name='Число ссылок')),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=posts.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Изображение'),
+        ),
+        migrations.RunPython(count_refs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fan_out_legacy_posts(apps, schema_editor):
+    """Раскладывает по лентам посты, написанные до материализации лент.
+
+    Посты популярных авторов остаются неразосланными: их лента
+    подмешивает при чтении.
+    """
+    Post = apps.get_model('posts', 'Post')
+    Follow = apps.get_model('posts', 'Follow')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    quote = schema_editor.connection.ops.quote_name
+    entries = quote(TimelineEntry._meta.db_table)
+    posts = quote(Post._meta.db_table)
+    follows = quote(Follow._meta.db_table)
+    popular = (
+        f'SELECT author_id FROM {follows} '
+        f'GROUP BY author_id HAVING COUNT(*) > %s'
+    )
+    limit = settings.TIMELINE_FANOUT_MAX_FOLLOWERS
+    schema_editor.execute(
+        f'INSERT INTO {entries} (user_id, post_id, pub_date) '
+        f'SELECT f.user_id, p.id, p.pub_date FROM {posts} p '
+        f'JOIN {follows} f ON f.author_id = p.author_id '
+        f'WHERE p.fanned_out = %s AND p.author_id NOT IN ({popular}) '
+        f'AND NOT EXISTS (SELECT 1 FROM {entries} t '
+        f'WHERE t.user_id = f.user_id AND t.post_id = p.id)',
+        [False, limit],
+    )
+    schema_editor.execute(
+        f'UPDATE {posts} SET fanned_out = %s '
+        f'WHERE fanned_out = %s AND author_id NOT IN ({popular})',
+        [True, False, limit],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'fanned_out', '-pub_date', '-id'], name='post_author_unfanned_idx'),
+        ),
+        migrations.RunPython(fan_out_legacy_posts, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .storage import image_storage
+
 User = get_user_model()
 
 
@@ -19,6 +21,7 @@ class Post(models.Model):
     image = models.ImageField(
         'Изображение',
         upload_to='posts/',
+        storage=image_storage,
         blank=True,
     )
     author = models.ForeignKey(
@@ -36,12 +39,40 @@ class Post(models.Model):
         related_name='posts',
         help_text='Группа, к которой будет относиться пост',
     )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False,
+    )
+    fanned_out = models.BooleanField(
+        'Разослан по лентам подписчиков',
+        default=False,
+        editable=False,
+    )
 
     def __str__(self):
         return self.text[:15]
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_date_idx'
+            ),
+            models.Index(
+                fields=['author', 'fanned_out', '-pub_date', '-id'],
+                name='post_author_unfanned_idx'
+            ),
+        ]
 
 
 class Comment(models.Model):
@@ -73,6 +104,12 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_idx'
+            )
+        ]
 
 
 class Follow(models.Model):
@@ -94,3 +131,60 @@ class Follow(models.Model):
                 name='Dont_subscribe_twice'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_idx'
+            )
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Пост в материализованной ленте подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='timeline_post_once'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_date_idx'
+            )
+        ]
+
+
+class UserStats(models.Model):
+    """Денормализованные счётчики пользователя, см. posts.counters."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков',
+        default=0,
+    )
+    following_count = models.PositiveIntegerField('Число подписок', default=0)
+
+
+class MediaBlob(models.Model):
+    """Файл картинки и число постов, которые на него ссылаются."""
+    name = models.CharField(max_length=100, primary_key=True)
+    refs = models.PositiveIntegerField('Число ссылок', default=0)
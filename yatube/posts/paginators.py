@@ -0,0 +1,178 @@
+import base64
+import binascii
+import json
+import operator
+from datetime import datetime
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.functional import SimpleLazyObject, cached_property
+
+from .counts import bounded_count
+
+FEED_ORDERING = ('-pub_date', '-id')
+
+
+def encode_cursor(values):
+    data = json.dumps([
+        value.isoformat() if isinstance(value, datetime) else value
+        for value in values
+    ])
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    if not token:
+        return None
+    try:
+        data = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(data.decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+class CursorPaginator(Paginator):
+    """Постраничный вывод по ключу сортировки вместо OFFSET.
+
+    Пагинатор описывает одну страницу: курсоры ``after``/``before`` из
+    запроса передаются в конструктор, а ``get_page`` возвращает обычный
+    ``Page``. Страница выбирается по индексу сортировки за один запрос
+    ``LIMIT per_page + 1``, поэтому глубокие страницы стоят столько же,
+    сколько первая. Общее число строк нужно только для подписи
+    «страниц: N» и берётся у ``counter``, который возвращает пару
+    (число, точное ли оно). ``prepare`` получает список объектов
+    страницы после выборки, например чтобы подгрузить к ним данные разом.
+    """
+
+    def __init__(self, object_list, per_page, ordering=FEED_ORDERING,
+                 after=None, before=None, counter=bounded_count,
+                 prepare=None):
+        super().__init__(object_list, per_page)
+        self.ordering = ordering
+        self.counter = counter
+        self.prepare = prepare
+        self.keys = [field.lstrip('-') for field in ordering]
+        self.after = self._parse_cursor(after)
+        self.before = None if self.after else self._parse_cursor(before)
+
+    def _key_field(self, name):
+        query = self.object_list.query
+        if name in query.annotations:
+            return query.annotations[name].output_field
+        return self.object_list.model._meta.get_field(name)
+
+    def _parse_cursor(self, token):
+        values = decode_cursor(token)
+        if values is None or len(values) != len(self.keys):
+            return None
+        try:
+            return [
+                self._key_field(name).to_python(value)
+                for name, value in zip(self.keys, values)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            return None
+
+    def _seek(self, values, backwards):
+        condition = Q()
+        for position, field in enumerate(self.ordering):
+            descending = field.startswith('-')
+            lookup = 'lt' if descending != backwards else 'gt'
+            step = Q(**{f'{self.keys[position]}__{lookup}': values[position]})
+            for name, value in zip(self.keys[:position], values):
+                step &= Q(**{name: value})
+            condition |= step
+        return condition
+
+    def _cursor(self, obj):
+        return encode_cursor([getattr(obj, name) for name in self.keys])
+
+    def _fetch(self, posts, ordering, condition):
+        return list(
+            posts.filter(condition).order_by(*ordering)[:self.per_page + 1]
+        )
+
+    @cached_property
+    def window(self):
+        ordering = self.ordering
+        condition = Q()
+        if self.before is not None:
+            ordering = [
+                field[1:] if field.startswith('-') else f'-{field}'
+                for field in ordering
+            ]
+            condition = self._seek(self.before, backwards=True)
+        elif self.after is not None:
+            condition = self._seek(self.after, backwards=False)
+        items = self._fetch(self.object_list, ordering, condition)
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if self.prepare is not None:
+            self.prepare(items)
+        if self.before is not None:
+            items.reverse()
+            return items, has_more, True
+        return items, self.after is not None, has_more
+
+    @cached_property
+    def counted(self):
+        return self.counter(self.object_list)
+
+    @property
+    def count(self):
+        return self.counted[0]
+
+    @property
+    def count_is_exact(self):
+        return self.counted[1]
+
+    @property
+    def has_previous(self):
+        return self.window[1]
+
+    @property
+    def has_next(self):
+        return self.window[2]
+
+    @property
+    def previous_cursor(self):
+        items, has_previous, _ = self.window
+        return self._cursor(items[0]) if has_previous and items else None
+
+    @property
+    def next_cursor(self):
+        items, _, has_next = self.window
+        return self._cursor(items[-1]) if has_next and items else None
+
+    def get_page(self, number=None):
+        """Страница, заданная курсорами; номер страницы не используется."""
+        return Page(SimpleLazyObject(lambda: self.window[0]), 1, self)
+
+
+class MergingCursorPaginator(CursorPaginator):
+    """Курсорный пагинатор, сливающий несколько источников одним запросом.
+
+    Каждый источник — queryset с общим ключом сортировки; из него
+    берутся id окна той же длины (свой поиск по индексу с LIMIT), а
+    страница выбирается из ``posts`` по объединению этих id. Сортируется
+    не больше ``(источников) * (per_page + 1)`` строк, сколько бы
+    объектов ни было в источниках.
+    """
+
+    def __init__(self, sources, per_page, posts, **kwargs):
+        self.sources = sources
+        super().__init__(posts, per_page, **kwargs)
+
+    def _fetch(self, posts, ordering, condition):
+        windows = reduce(operator.or_, (
+            Q(pk__in=(
+                source.filter(condition)
+                .order_by(*ordering)
+                .values('pk')[:self.per_page + 1]
+            ))
+            for source in self.sources
+        ))
+        return super()._fetch(posts.filter(windows), ordering, Q())
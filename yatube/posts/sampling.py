@@ -0,0 +1,11 @@
+"""Распределения для синтетических данных: ``seeding`` и ``benchmarks``."""
+
+
+def zipf_weights(count, skew):
+    """Накопленные веса закона Ципфа: вес i-го элемента (i + 1) ** -skew."""
+    total = 0
+    weights = []
+    for rank in range(1, count + 1):
+        total += rank ** -skew
+        weights.append(total)
+    return weights
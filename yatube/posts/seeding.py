@@ -0,0 +1,305 @@
+"""Быстрое заполнение базы синтетическими данными, см. ``manage.py seed``.
+
+Строки генерируются потоком и пишутся пачками через ``executemany``
+в обход моделей: без сигналов, ``save()`` и построения объектов на
+каждую строку. Первичные ключи назначаются заранее, поэтому внешние
+ключи считаются без чтения только что вставленных строк. В SQLite на
+время загрузки снимаются вторичные индексы и проверка внешних ключей:
+построить индекс по готовой таблице быстрее, чем обновлять его на
+каждой вставке.
+"""
+import itertools
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from faker.providers.lorem.ru_RU import Provider as Lorem
+
+from . import cache_tags, counts
+from .models import Comment, Follow, Group, Post, TimelineEntry, User
+from .sampling import zipf_weights
+
+START_DATE = datetime(2020, 1, 1, tzinfo=timezone.utc)
+SENTENCES = 5000
+DAY = 24 * 60 * 60
+
+
+class Seeder:
+    def __init__(self, seed=0, batch_size=50000):
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.adapt_date = connection.ops.adapt_datetimefield_value
+        self.sentences = [
+            ' '.join(
+                self.rng.choices(Lorem.word_list, k=self.rng.randint(4, 12))
+            ).capitalize() + '.'
+            for _ in range(SENTENCES)
+        ]
+
+    def next_id(self, model):
+        return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+    def text(self, low, high):
+        return ' '.join(
+            self.rng.choices(self.sentences, k=self.rng.randint(low, high))
+        )
+
+    def texts(self, count, low, high, pool=20000):
+        """Поток из ``count`` текстов по ``low``-``high`` предложений.
+
+        Тексты выбираются из заранее собранного набора: собирать каждый
+        заново оказывается самой медленной частью загрузки.
+        """
+        texts = [self.text(low, high) for _ in range(min(count, pool))]
+        return self.sample(texts, None, count)
+
+    def dates(self, count, step):
+        """Возрастающие даты с шагом ``step`` секунд в формате БД.
+
+        SQLite хранит дату строкой, и склеить её из готовых дня и
+        времени суток намного быстрее, чем форматировать datetime.
+        """
+        moments = (
+            START_DATE + timedelta(seconds=i * step) for i in range(count)
+        )
+        if connection.vendor != 'sqlite' or DAY % step:
+            yield from map(self.adapt_date, moments)
+            return
+        times = [
+            str(self.adapt_date(START_DATE + timedelta(seconds=second)))[10:]
+            for second in range(0, DAY, step)
+        ]
+        day = 0
+        while count > 0:
+            prefix = str(self.adapt_date(START_DATE + timedelta(days=day)))
+            prefix = prefix[:10]
+            yield from (prefix + time for time in times[:count])
+            count -= len(times)
+            day += 1
+
+    @contextmanager
+    def bulk_load(self, *models):
+        """Снимает на время загрузки индексы и проверку внешних ключей.
+
+        Действует только в SQLite; индексы потом строятся заново по тем
+        же определениям из sqlite_master.
+        """
+        if connection.vendor != 'sqlite':
+            yield
+            return
+        tables = [model._meta.db_table for model in models]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT name, sql FROM sqlite_master WHERE type = %s '
+                f'AND sql IS NOT NULL AND tbl_name IN '
+                f'({", ".join(["%s"] * len(tables))})',
+                ['index', *tables],
+            )
+            indexes = cursor.fetchall()
+            cursor.execute('PRAGMA foreign_keys = OFF')
+            for name, _ in indexes:
+                cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                for _, sql in indexes:
+                    cursor.execute(sql)
+                cursor.execute('PRAGMA foreign_keys = ON')
+
+    def insert(self, model, fields, rows):
+        """Пишет строки пачками; возвращает их число."""
+        opts = model._meta
+        columns = ', '.join(
+            connection.ops.quote_name(opts.get_field(name).column)
+            for name in fields
+        )
+        sql = (
+            f'INSERT INTO {connection.ops.quote_name(opts.db_table)} '
+            f'({columns}) VALUES ({", ".join(["%s"] * len(fields))})'
+        )
+        total = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            while True:
+                batch = list(itertools.islice(rows, self.batch_size))
+                if not batch:
+                    break
+                cursor.executemany(sql, batch)
+                total += len(batch)
+        return total
+
+    def reset_sequences(self, *models):
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def forget_caches(self, user_ids, group_ids, post_ids):
+        """Сбрасывает кэш страниц и счётчиков, которые загрузка обошла.
+
+        Сигналы при загрузке не срабатывают, а теги новых id могли
+        остаться в кэше от прежней базы, где были объекты с теми же id.
+        """
+        counts.forget([
+            counts.global_scope(), *map(counts.group_scope, group_ids)
+        ])
+        tags = itertools.chain(
+            [cache_tags.INDEX_TAG],
+            itertools.chain.from_iterable(
+                (cache_tags.author_tag(pk), cache_tags.author_name_tag(pk))
+                for pk in user_ids
+            ),
+            itertools.chain.from_iterable(
+                (cache_tags.group_tag(pk), cache_tags.group_name_tag(pk))
+                for pk in group_ids
+            ),
+            itertools.chain.from_iterable(
+                (cache_tags.post_tag(pk), cache_tags.comments_tag(pk))
+                for pk in post_ids
+            ),
+        )
+        while True:
+            batch = list(itertools.islice(tags, self.batch_size))
+            if not batch:
+                return
+            cache_tags.invalidate(*batch)
+
+    def users(self, count):
+        first = self.next_id(User)
+        joined = self.adapt_date(START_DATE)
+        rows = (
+            (pk, '!', False, f'seed{pk}', '', '', '', False, True, joined)
+            for pk in range(first, first + count)
+        )
+        self.insert(
+            User,
+            ('id', 'password', 'is_superuser', 'username', 'first_name',
+             'last_name', 'email', 'is_staff', 'is_active', 'date_joined'),
+            rows,
+        )
+        return list(range(first, first + count))
+
+    def groups(self, count):
+        first = self.next_id(Group)
+        rows = (
+            (pk, self.text(1, 1)[:200], f'seed-{pk}', self.text(2, 5))
+            for pk in range(first, first + count)
+        )
+        self.insert(Group, ('id', 'title', 'slug', 'description'), rows)
+        return list(range(first, first + count))
+
+    def posts(self, count, user_ids, group_ids, skew, group_ratio=0.7):
+        """Посты; доля постов автора убывает с рангом по Ципфу."""
+        first = self.next_id(Post)
+        authors = zipf_weights(len(user_ids), skew)
+        # Пустые группы вытягиваются с той же вероятностью, что и доля
+        # постов без группы.
+        groups = list(group_ids) or [None]
+        if group_ids and group_ratio < 1:
+            groups += [None] * round(
+                len(group_ids) * (1 - group_ratio) / group_ratio
+            )
+        rows = (
+            (pk, text, date, '', author_id, group_id, 0, False)
+            for pk, text, date, author_id, group_id in zip(
+                range(first, first + count),
+                self.texts(count, 1, 6),
+                self.dates(count, 60),
+                self.sample(user_ids, authors, count),
+                self.sample(groups, None, count),
+            )
+        )
+        self.insert(
+            Post,
+            ('id', 'text', 'pub_date', 'image', 'author', 'group',
+             'comments_count', 'fanned_out'),
+            rows,
+        )
+        return range(first, first + count)
+
+    def comments(self, count, post_ids, user_ids, skew):
+        """Комментарии; обсуждаемость постов распределена по Ципфу."""
+        first = self.next_id(Comment)
+        popular = zipf_weights(len(post_ids), skew)
+        rows = zip(
+            range(first, first + count),
+            self.texts(count, 1, 2),
+            self.sample(post_ids, popular, count),
+            self.sample(user_ids, None, count),
+            self.dates(count, 30),
+        )
+        return self.insert(
+            Comment, ('id', 'text', 'post', 'author', 'created'), rows
+        )
+
+    def follows(self, per_user, user_ids, skew):
+        """Подписки; на популярных по Ципфу авторов подписываются чаще."""
+        first = self.next_id(Follow)
+        authors = zipf_weights(len(user_ids), skew)
+        wanted = min(per_user, len(user_ids) - 1)
+
+        def edges():
+            for user_id in user_ids:
+                followed = set()
+                while len(followed) < wanted:
+                    for author_id in self.rng.choices(
+                        user_ids, cum_weights=authors, k=wanted
+                    ):
+                        if author_id != user_id and len(followed) < wanted:
+                            followed.add(author_id)
+                yield from ((user_id, author_id) for author_id in followed)
+
+        rows = (
+            (pk, user_id, author_id)
+            for pk, (user_id, author_id)
+            in zip(itertools.count(first), edges())
+        )
+        return self.insert(Follow, ('id', 'user', 'author'), rows)
+
+    def timelines(self):
+        """Раскладывает неразосланные посты по лентам одним запросом.
+
+        То же, что ``manage.py rebuild_timelines``, но без чтения постов
+        в Python: на миллионах записей лент это на порядки быстрее.
+        Посты авторов с подписчиками сверх порога не рассылаются.
+        """
+        quote = connection.ops.quote_name
+        entries = quote(TimelineEntry._meta.db_table)
+        posts = quote(Post._meta.db_table)
+        follows = quote(Follow._meta.db_table)
+        popular = (
+            f'SELECT author_id FROM {follows} '
+            f'GROUP BY author_id HAVING COUNT(*) > %s'
+        )
+        limit = settings.TIMELINE_FANOUT_MAX_FOLLOWERS
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {entries} (user_id, post_id, pub_date) '
+                f'SELECT f.user_id, p.id, p.pub_date FROM {posts} p '
+                f'JOIN {follows} f ON f.author_id = p.author_id '
+                f'WHERE p.fanned_out = %s AND p.author_id NOT IN ({popular})',
+                [False, limit],
+            )
+            total = cursor.rowcount
+            cursor.execute(
+                f'UPDATE {posts} SET fanned_out = %s '
+                f'WHERE fanned_out = %s AND author_id NOT IN ({popular})',
+                [True, False, limit],
+            )
+        return total
+
+    def sample(self, population, cum_weights, count):
+        """Поток из ``count`` элементов, выбранных с весами, пачками.
+
+        Без ``cum_weights`` элементы равновероятны.
+        """
+        while count > 0:
+            size = min(count, self.batch_size)
+            yield from self.rng.choices(
+                population, cum_weights=cum_weights, k=size
+            )
+            count -= size
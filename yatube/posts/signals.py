@@ -0,0 +1,178 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import blobs, cache_tags, counters, counts, fulltext, timelines
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+AUTHOR_FIELDS = {'username', 'first_name', 'last_name'}
+GROUP_FIELDS = {'title', 'slug'}
+
+
+@receiver(pre_save, sender=Post)
+def remember_old_post(sender, instance, **kwargs):
+    if instance._state.adding:
+        return
+    old = Post.objects.filter(pk=instance.pk).values(
+        'id', 'author_id', 'group_id', 'image'
+    ).first()
+    instance._old_post = Post(**old) if old else None
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    fulltext.index_post(instance)
+    if created:
+        blobs.retain([instance.image.name])
+        counts.shift(counts.post_scopes(instance), 1)
+        counters.shift_user(instance.author_id, posts_count=1)
+        timelines.fan_out(instance)
+        cache_tags.invalidate(
+            cache_tags.INDEX_TAG, *cache_tags.post_tags(instance)
+        )
+        return
+    old_post = getattr(instance, '_old_post', None) or instance
+    if old_post.image.name != instance.image.name:
+        blobs.retain([instance.image.name])
+        blobs.release([old_post.image.name])
+    old = set(counts.post_scopes(old_post))
+    new = set(counts.post_scopes(instance))
+    counts.shift(old - new, -1)
+    counts.shift(new - old, 1)
+    if old_post.author_id != instance.author_id:
+        counters.shift_user(old_post.author_id, posts_count=-1)
+        counters.shift_user(instance.author_id, posts_count=1)
+    old_tags = set(cache_tags.post_tags(old_post))
+    new_tags = set(cache_tags.post_tags(instance))
+    cache_tags.invalidate(*(old_tags | new_tags))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    fulltext.remove_post(instance.pk)
+    blobs.release([instance.image.name])
+    counts.shift(counts.post_scopes(instance), -1)
+    counters.shift_user(instance.author_id, posts_count=-1)
+    cache_tags.invalidate(
+        cache_tags.INDEX_TAG, *cache_tags.post_tags(instance)
+    )
+
+
+def _old_values(model, instance, fields, update_fields=None):
+    """Сохранённые значения ``fields`` до записи или None.
+
+    Запрос делается, только если запись может менять эти поля.
+    """
+    if instance._state.adding or (
+        update_fields is not None and not fields & set(update_fields)
+    ):
+        return None
+    return model.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+def _changed(instance, old, fields):
+    return old is not None and any(
+        getattr(instance, field) != old[field] for field in fields
+    )
+
+
+def invalidate_author_names(author_id):
+    """Имя автора выводится в его постах и комментариях на чужих страницах."""
+    groups = Post.objects.filter(author_id=author_id).exclude(
+        group=None
+    ).order_by().values_list('group_id', flat=True).distinct()
+    commented = Comment.objects.filter(author_id=author_id).order_by(
+    ).values_list('post_id', flat=True).distinct()
+    cache_tags.invalidate(
+        cache_tags.author_tag(author_id),
+        cache_tags.author_name_tag(author_id),
+        *map(cache_tags.group_tag, groups),
+        *map(cache_tags.comments_tag, commented),
+    )
+
+
+def invalidate_group_names(group_id):
+    """Название группы выводится в карточках постов в профилях авторов."""
+    authors = Post.objects.filter(group_id=group_id).order_by().values_list(
+        'author_id', flat=True
+    ).distinct()
+    cache_tags.invalidate(
+        cache_tags.group_tag(group_id),
+        cache_tags.group_name_tag(group_id),
+        *map(cache_tags.author_tag, authors),
+    )
+
+
+@receiver(pre_save, sender=Group)
+def remember_old_group(sender, instance, update_fields=None, **kwargs):
+    instance._old_names = _old_values(
+        Group, instance, GROUP_FIELDS, update_fields
+    )
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    old = getattr(instance, '_old_names', None)
+    if _changed(instance, old, GROUP_FIELDS):
+        invalidate_group_names(instance.pk)
+    else:
+        cache_tags.invalidate(cache_tags.group_tag(instance.pk))
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    invalidate_group_names(instance.pk)
+
+
+@receiver(pre_save, sender=User)
+def remember_old_user(sender, instance, update_fields=None, raw=False,
+                      **kwargs):
+    instance._old_names = None if raw else _old_values(
+        User, instance, AUTHOR_FIELDS, update_fields
+    )
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+    if _changed(instance, getattr(instance, '_old_names', None),
+                AUTHOR_FIELDS):
+        invalidate_author_names(instance.pk)
+
+
+def invalidate_follow(follow):
+    """Счётчики подписок выводятся в профилях обоих пользователей."""
+    cache_tags.invalidate(
+        cache_tags.author_tag(follow.user_id),
+        cache_tags.author_tag(follow.author_id),
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.shift_user(instance.user_id, following_count=1)
+        counters.shift_user(instance.author_id, followers_count=1)
+        timelines.backfill(instance.user_id, instance.author_id)
+        invalidate_follow(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.shift_user(instance.user_id, following_count=-1)
+    counters.shift_user(instance.author_id, followers_count=-1)
+    timelines.trim(instance.user_id, instance.author_id)
+    invalidate_follow(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.shift_comments(instance.post_id, 1)
+    cache_tags.invalidate(cache_tags.comments_tag(instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.shift_comments(instance.post_id, -1)
+    cache_tags.invalidate(cache_tags.comments_tag(instance.post_id))
@@ -0,0 +1,60 @@
+"""Хранилище картинок постов, адресуемое содержимым.
+
+Файл называется хешем содержимого: ``posts/ab/ab12…ef.jpg``. Одинаковая
+картинка, загруженная снова, не пишется на диск второй раз, и её
+миниатюры, ключ которых — имя исходника, тоже общие. Сколько постов
+ссылается на файл, считает ``posts.blobs``.
+
+Хеш берётся от загруженного файла: ``posts.uploads`` потом обрабатывает
+его на месте, и повторная загрузка того же оригинала находит уже
+обработанный файл.
+"""
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+CHUNK_SIZE = 64 * 1024
+
+
+def content_hash(content):
+    """SHA-256 содержимого файла; позиция чтения возвращается в начало."""
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks(CHUNK_SIZE):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Файловое хранилище с именами по хешу содержимого."""
+
+    def hashed_name(self, name, content):
+        """Имя по хешу в каталоге ``name``; расширение сохраняется."""
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        digest = content_hash(content)
+        return os.path.join(
+            directory, digest[:2], f'{digest}{extension}'
+        ).replace('\\', '/')
+
+    def save(self, name, content, max_length=None):
+        """Пишет файл, только если такого содержимого ещё нет."""
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            # Повторная загрузка освежает файл: сборщик мусора не тронет
+            # его, пока пост со ссылкой ещё не зафиксирован.
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+image_storage = ContentAddressedStorage()
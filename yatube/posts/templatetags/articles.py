@@ -0,0 +1,69 @@
+import hashlib
+import json
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+
+from .. import cache_tags
+
+register = template.Library()
+
+ARTICLE_KEY = 'posts:article:{}'
+
+
+def _key(variant, post, tag_versions):
+    data = json.dumps([variant, post.pk, sorted(tag_versions.items())])
+    return ARTICLE_KEY.format(hashlib.md5(data.encode()).hexdigest())
+
+
+def _page_articles(context, page):
+    """Готовые карточки постов страницы: версии и карточки разом.
+
+    Ключ карточки включает версии её тегов, поэтому устаревшая запись
+    просто не находится. Результат запоминается на странице.
+    """
+    articles = getattr(page, 'articles', None)
+    if articles is not None:
+        return articles
+    variant = context['request'].resolver_match.view_name
+    posts = list(page)
+    tag_versions = cache_tags.versions({
+        tag for post in posts for tag in cache_tags.article_tags(post)
+    })
+    keys = {
+        post.pk: _key(variant, post, {
+            tag: tag_versions[tag] for tag in cache_tags.article_tags(post)
+        })
+        for post in posts
+    }
+    found = cache.get_many(list(keys.values()))
+    page.articles = articles = {
+        'keys': keys,
+        'html': {
+            pk: found[key] for pk, key in keys.items() if key in found
+        },
+    }
+    return articles
+
+
+@register.simple_tag(takes_context=True)
+def article(context, post, page):
+    """Карточка поста из includes/article.html через кэш.
+
+    ``{% article post page_obj %}``: на первой карточке страницы все её
+    карточки берутся одним ``get_many``, отрисовываются только промахи.
+    """
+    articles = _page_articles(context, page)
+    html = articles['html'].get(post.pk)
+    if html is not None:
+        return mark_safe(html)
+    with context.push(post=post):
+        html = context.template.engine.get_template(
+            'includes/article.html'
+        ).render(context)
+    cache.set(
+        articles['keys'][post.pk], html, settings.ARTICLE_CACHE_TIMEOUT
+    )
+    return html
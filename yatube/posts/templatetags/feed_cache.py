@@ -0,0 +1,71 @@
+import hashlib
+
+from django import template
+from django.conf import settings
+
+from .. import cache_tags
+from ..paginators import encode_cursor
+
+register = template.Library()
+
+
+class FeedCacheNode(template.Node):
+    def __init__(self, nodelist, scope, page_obj):
+        self.nodelist = nodelist
+        self.scope = scope
+        self.page_obj = page_obj
+
+    def render(self, context):
+        scope = self.scope.resolve(context)
+        request = context['request']
+        page_obj = self.page_obj.resolve(context)
+        paginator = page_obj.paginator
+        # Курсоры — те, что разобрал пагинатор: мусор в адресе ведёт на
+        # первую страницу и не заводит отдельных записей.
+        variant = '|'.join((
+            scope,
+            'auth' if request.user.is_authenticated else 'anon',
+            *(
+                '' if cursor is None else encode_cursor(cursor)
+                for cursor in (paginator.after, paginator.before)
+            ),
+        ))
+        key = 'posts:feed:' + hashlib.md5(variant.encode()).hexdigest()
+        html = cache_tags.get_fragment(key)
+        if html is not None:
+            return html
+        # Версии читаются до отрисовки: правка во время неё сделает
+        # запись устаревшей, а не сохранит старую разметку с новой версией.
+        tags = {scope} | {
+            tag
+            for post in page_obj
+            for tag in cache_tags.post_tags(post)
+        }
+        tag_versions = cache_tags.versions(tags)
+        html = self.nodelist.render(context)
+        cache_tags.set_fragment(
+            key, html, tag_versions, settings.FEED_CACHE_TIMEOUT
+        )
+        return html
+
+
+@register.tag
+def feedcache(parser, token):
+    """Кэширует ленту с учётом курсора, авторизации и тегов её постов.
+
+    Использование: ``{% feedcache 'feed:index' page_obj %}``. Запись
+    устаревает, когда инвалидирован тег ленты или тег любого поста,
+    автора или группы на странице.
+    """
+    bits = token.split_contents()
+    if len(bits) != 3:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]} принимает тег ленты и страницу'
+        )
+    nodelist = parser.parse(('endfeedcache',))
+    parser.delete_first_token()
+    return FeedCacheNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        parser.compile_filter(bits[2]),
+    )
@@ -0,0 +1,14 @@
+from django import template
+
+from .. import thumbnails
+
+register = template.Library()
+
+
+@register.inclusion_tag('includes/picture.html')
+def post_picture(post, preset, css_class=''):
+    """``<picture>`` с вариантами 1x/2x во всех готовых форматах.
+
+    ``{% post_picture post 'preview' 'image' %}``
+    """
+    return {**thumbnails.picture(post, preset), 'css_class': css_class}
@@ -0,0 +1,126 @@
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class ApiTests(TestCase):
+    """Тестирование JSON API лент"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test', description='Описание'
+        )
+        cls.authors = [
+            User.objects.create_user(username=f'author{i}') for i in range(4)
+        ]
+        Follow.objects.create(user=cls.reader, author=cls.authors[0])
+        Post.objects.bulk_create(
+            Post(
+                author=cls.authors[i % 4],
+                group=cls.group if i % 2 else None,
+                text=f'Пост {i}',
+            )
+            for i in range(60)
+        )
+        cls.post = Post.objects.order_by('id').first()
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.authors[i % 4],
+                    text=f'Комментарий {i}')
+            for i in range(7)
+        )
+
+    def get(self, url, status=200, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status)
+        return response.json()
+
+    def test_index_walks_with_cursors(self):
+        url = reverse('posts:api_index')
+        seen = []
+        body = self.get(url, limit=25)
+        while True:
+            seen += [post['id'] for post in body['data']]
+            if not body['next']:
+                break
+            body = self.get(url, limit=25, after=body['next'])
+        expected = list(
+            Post.objects.order_by('-pub_date', '-id')
+            .values_list('id', flat=True)
+        )
+        self.assertEqual(seen, expected)
+        self.assertEqual(
+            set(body['data'][0]),
+            {'id', 'text', 'pub_date', 'author', 'group', 'image',
+             'comments_count'},
+        )
+
+    def test_includes_cost_constant_queries(self):
+        url = reverse('posts:api_index')
+        for limit in (5, 50):
+            with self.subTest(limit=limit), self.assertNumQueries(3):
+                body = self.get(url, limit=limit, include='author,group')
+        self.assertEqual(
+            {author['username'] for author in body['included']['author']},
+            {author.username for author in self.authors},
+        )
+        self.assertEqual(body['included']['group'][0]['slug'], 'test')
+        self.assertNotIn('password', body['included']['author'][0])
+
+    def test_sparse_fields(self):
+        body = self.get(reverse('posts:api_index'), fields='id,text')
+        self.assertEqual(set(body['data'][0]), {'id', 'text'})
+        self.assertEqual(body['included'], {})
+
+    def test_bad_parameters(self):
+        url = reverse('posts:api_index')
+        for params in ({'fields': 'id,password'}, {'include': 'comments'},
+                       {'limit': '0'}, {'limit': 'много'}):
+            with self.subTest(params=params):
+                self.assertIn('error', self.get(url, status=400, **params))
+
+    def test_scoped_feeds(self):
+        group = self.get(
+            reverse('posts:api_group_posts', args=[self.group.slug]),
+            limit=100,
+        )
+        self.assertEqual(len(group['data']), 30)
+        profile = self.get(
+            reverse('posts:api_profile', args=[self.authors[1].username]),
+            limit=100,
+        )
+        self.assertEqual(
+            {post['author'] for post in profile['data']},
+            {self.authors[1].pk},
+        )
+
+    def test_follow_feed(self):
+        url = reverse('posts:api_follow_index')
+        self.get(url, status=401)
+        client = Client()
+        client.force_login(self.reader)
+        body = client.get(url, {'limit': 100}).json()
+        self.assertEqual(len(body['data']), 15)
+        self.assertEqual(
+            {post['author'] for post in body['data']}, {self.authors[0].pk}
+        )
+
+    def test_post_detail_and_comments(self):
+        body = self.get(
+            reverse('posts:api_post_detail', args=[self.post.pk]),
+            include='author',
+        )
+        self.assertEqual(body['data']['text'], self.post.text)
+        self.assertEqual(body['included']['author'][0]['id'],
+                         self.post.author_id)
+        url = reverse('posts:api_comments', args=[self.post.pk])
+        first = self.get(url, limit=5, include='author')
+        rest = self.get(url, limit=5, after=first['next'])
+        texts = [comment['text'] for comment in first['data'] + rest['data']]
+        self.assertEqual(texts, [f'Комментарий {i}' for i in range(7)])
+        self.assertIsNone(rest['next'])
+        self.get(url, status=400, include='group')
+        self.get(
+            reverse('posts:api_post_detail', args=[10 ** 6]), status=404
+        )
@@ -0,0 +1,70 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post, User
+
+
+class ArticleCacheTests(TestCase):
+    """Тестирование кэша карточек постов"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}'
+            )
+            for i in range(3)
+        ]
+        cls.group_url = reverse('posts:group_list', args=(cls.group.slug,))
+        cls.profile_url = reverse(
+            'posts:profile', args=(cls.author.username,)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_articles_are_not_rendered_again(self):
+        first = self.client.get(self.group_url)
+        self.assertTemplateUsed(first, 'includes/article.html')
+        second = self.client.get(self.group_url)
+        self.assertTemplateNotUsed(second, 'includes/article.html')
+        self.assertEqual(first.content, second.content)
+
+    def test_edit_rerenders_only_its_article(self):
+        self.client.get(self.group_url)
+        post = self.posts[0]
+        post.text = 'Новый текст'
+        post.save()
+        response = self.client.get(self.group_url)
+        self.assertContains(response, 'Новый текст')
+        rendered = [
+            template.name for template in response.templates
+            if template.name == 'includes/article.html'
+        ]
+        self.assertEqual(len(rendered), 1)
+
+    def test_comments_keep_articles_cached(self):
+        self.client.get(self.group_url)
+        Comment.objects.create(
+            post=self.posts[0], author=self.author, text='Комментарий'
+        )
+        response = self.client.get(self.group_url)
+        self.assertTemplateNotUsed(response, 'includes/article.html')
+
+    def test_renames_invalidate_articles(self):
+        self.client.get(self.group_url)
+        self.client.get(self.profile_url)
+        self.author.first_name = 'Фёдор'
+        self.author.save()
+        self.assertContains(self.client.get(self.group_url), 'Фёдор Толстой')
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertContains(
+            self.client.get(self.profile_url), 'Новое название'
+        )
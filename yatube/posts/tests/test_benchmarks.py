@@ -0,0 +1,75 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.db.models import Count
+from django.test import TestCase, override_settings
+
+from .. import benchmarks
+from ..models import Comment, Follow, Group, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SIZES = {'users': 20, 'groups': 3, 'posts': 200, 'comments': 100,
+         'follows': 5}
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BenchmarkTests(TestCase):
+    """Тестирование набора данных и замеров для бенчмарка"""
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def snapshot(self):
+        return list(
+            Post.objects.order_by('pub_date').values_list(
+                'author__username', 'group__slug', 'text', 'image'
+            )
+        ), sorted(
+            Follow.objects.values_list('user__username', 'author__username')
+        )
+
+    def test_dataset_is_reproducible(self):
+        benchmarks.build_dataset(seed=1, **SIZES)
+        first = self.snapshot()
+        for model in (Comment, Follow, Post, Group, User):
+            model.objects.all().delete()
+        benchmarks.build_dataset(seed=1, **SIZES)
+        self.assertEqual(self.snapshot(), first)
+
+    def test_dataset_shape(self):
+        benchmarks.build_dataset(seed=1, **SIZES)
+        self.assertEqual(Post.objects.count(), SIZES['posts'])
+        self.assertEqual(Comment.objects.count(), SIZES['comments'])
+        self.assertEqual(
+            Follow.objects.count(), SIZES['users'] * SIZES['follows']
+        )
+        per_author = sorted(
+            User.objects.annotate(total=Count('posts'))
+            .values_list('total', flat=True),
+            reverse=True,
+        )
+        self.assertGreater(per_author[0], 5 * per_author[len(per_author) // 2])
+        self.assertTrue(Post.objects.exclude(image='').exists())
+
+    def test_run_reports_every_view(self):
+        benchmarks.build_dataset(seed=1, **SIZES)
+        results = benchmarks.run(repeat=3)
+        self.assertEqual(
+            set(results),
+            {'index', 'group_posts', 'profile', 'post_detail',
+             'follow_index'},
+        )
+        for name, modes in results.items():
+            for mode in ('cold', 'warm'):
+                with self.subTest(name=name, mode=mode):
+                    result = modes[mode]
+                    self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+                    self.assertGreater(result['queries'], 0)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(benchmarks.percentile(values, 0.5), 50)
+        self.assertEqual(benchmarks.percentile(values, 0.95), 95)
+        self.assertEqual(benchmarks.percentile([7], 0.95), 7)
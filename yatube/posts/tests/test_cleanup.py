@@ -0,0 +1,122 @@
+import os
+import shutil
+import tempfile
+import time
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from sorl.thumbnail import default
+
+from .. import batches, cleanup, thumbnails
+from ..models import Post, User
+from ..storage import image_storage
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def picture(color):
+    buffer = BytesIO()
+    Image.new('RGB', (20, 20), color).save(buffer, 'PNG')
+    return ContentFile(buffer.getvalue())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class CleanMediaTests(TestCase):
+    """Тестирование сборки мусора в media"""
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        self.author = User.objects.create_user(username='author')
+        self.used = image_storage.save('posts/used.png', picture('red'))
+        Post.objects.create(author=self.author, text='Пост', image=self.used)
+        self.orphan = image_storage.save('posts/lost.png', picture('blue'))
+        for name in (self.used, self.orphan):
+            thumbnails.generate(name)
+            self.age(name)
+
+    def age(self, name, seconds=2 * 60 * 60):
+        moment = time.time() - seconds
+        os.utime(image_storage.path(name), (moment, moment))
+
+    def clean(self, *args):
+        call_command(
+            'clean_media', '--rate=0', *args, stdout=StringIO()
+        )
+
+    def test_removes_orphan_with_thumbnails(self):
+        young = image_storage.save('posts/young.png', picture('green'))
+        lost = thumbnails.thumbnail_file(self.orphan, 'preview')
+        used = thumbnails.thumbnail_file(self.used, 'preview')
+        self.clean()
+        self.assertFalse(image_storage.exists(self.orphan))
+        self.assertFalse(lost.exists())
+        self.assertIsNone(default.kvstore.get(lost))
+        self.assertTrue(image_storage.exists(young))
+        self.assertTrue(image_storage.exists(self.used))
+        self.assertTrue(used.exists())
+        self.assertIsNotNone(default.kvstore.get(used))
+
+    def test_stale_kvstore_entries_and_unknown_thumbnails(self):
+        missing = thumbnails.thumbnail_file(self.used, 'preview')
+        default.storage.delete(missing.name)
+        unknown = default.storage.save(
+            'cache/zz/zz/unknown.png', picture('white')
+        )
+        self.age(unknown)
+        self.clean()
+        self.assertIsNone(default.kvstore.get(missing))
+        self.assertFalse(default.storage.exists(unknown))
+        self.assertIsNotNone(default.kvstore.get(
+            thumbnails.thumbnail_file(self.used, 'preview', 2)
+        ))
+
+    def test_reuploaded_orphan_is_kept(self):
+        self.assertEqual(
+            image_storage.save('posts/again.png', picture('blue')),
+            self.orphan,
+        )
+        self.clean()
+        self.assertTrue(image_storage.exists(self.orphan))
+
+    def test_dry_run(self):
+        self.clean('--dry-run')
+        self.assertTrue(image_storage.exists(self.orphan))
+
+    def test_resume_continues_after_last_batch(self):
+        states = []
+        first = cleanup.Collector(batch_size=1, min_age=0, dry_run=True)
+        first.run(on_batch=states.append)
+        self.assertEqual(first.checked['sources'], 2)
+        first_path = min(self.used, self.orphan)
+        self.assertEqual(states[0], {'phase': 'sources', 'after': first_path})
+        resumed = cleanup.Collector(batch_size=1, min_age=0, dry_run=True)
+        resumed.run(states[0])
+        self.assertEqual(resumed.checked['sources'], 1)
+        self.assertEqual(
+            resumed.checked['kvstore'], first.checked['kvstore']
+        )
+
+    def test_state_file_removed_after_full_run(self):
+        state = os.path.join(TEMP_MEDIA_ROOT, 'gc.state')
+        batches.save_state(state, {'phase': 'thumbnails', 'after': ''})
+        self.clean(f'--state={state}', '--resume')
+        self.assertTrue(image_storage.exists(self.orphan))
+        self.assertFalse(os.path.exists(state))
+
+    def test_throttle(self):
+        clock = mock.Mock(side_effect=[0, 0.1])
+        sleep = mock.Mock()
+        throttle = cleanup.Throttle(10, clock=clock, sleep=sleep)
+        throttle(5)
+        sleep.assert_called_once()
+        self.assertAlmostEqual(sleep.call_args[0][0], 0.4)
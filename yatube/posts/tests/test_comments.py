@@ -0,0 +1,61 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Post, User
+
+
+@override_settings(COMMENTS_ON_PAGE=5)
+class CommentPagesTests(TestCase):
+    """Тестирование постраничных комментариев"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        for i in range(12):
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.create_user(username=f'reader{i}'),
+                text=f'Комментарий {i}',
+            )
+        cls.url = reverse('posts:post_detail', args=(cls.post.id,))
+        cls.more_url = reverse('posts:post_comments', args=(cls.post.id,))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_first_page_in_constant_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        comments = response.context['comments']
+        self.assertEqual(
+            [comment.text for comment in comments],
+            [f'Комментарий {i}' for i in range(11, 6, -1)],
+        )
+        self.assertContains(response, 'reader11')
+        self.assertContains(response, self.more_url)
+
+    def test_load_more_walks_all_comments(self):
+        texts = []
+        url = self.url
+        while True:
+            response = self.client.get(url)
+            comments = response.context['comments']
+            texts += [comment.text for comment in comments]
+            if not comments.paginator.has_next:
+                break
+            url = (
+                f'{self.more_url}?after={comments.paginator.next_cursor}'
+            )
+            self.assertContains(response, url)
+        self.assertTemplateUsed(response, 'includes/comment_list.html')
+        self.assertNotContains(response, 'Показать ещё')
+        self.assertEqual(
+            texts, [f'Комментарий {i}' for i in range(11, -1, -1)]
+        )
+
+    def test_missing_post(self):
+        response = self.client.get(
+            reverse('posts:post_comments', args=(self.post.id + 1,))
+        )
+        self.assertEqual(response.status_code, 404)
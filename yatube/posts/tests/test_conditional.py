@@ -0,0 +1,121 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class ConditionalGetTests(TestCase):
+    """Тестирование ETag и Last-Modified страниц"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост'
+        )
+        cls.urls = {
+            'post': reverse('posts:post_detail', args=(cls.post.id,)),
+            'group': reverse('posts:group_list', args=(cls.group.slug,)),
+            'profile': reverse('posts:profile', args=(cls.author.username,)),
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def etag(self, url, client=None):
+        response = (client or self.client).get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_repeat_visit_gets_not_modified(self):
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                response = self.client.get(url)
+                self.assertIn('private', response['Cache-Control'])
+                self.assertIn('no-cache', response['Cache-Control'])
+                with self.assertNumQueries(1):
+                    repeat = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag']
+                    )
+                self.assertEqual(repeat.status_code, 304)
+                self.assertEqual(repeat.content, b'')
+                repeat = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                )
+                self.assertEqual(repeat.status_code, 304)
+
+    def test_etag_depends_on_user_and_cursor(self):
+        url = self.urls['group']
+        self.assertNotEqual(
+            self.etag(url), self.etag(url, self.reader_client)
+        )
+        self.assertNotEqual(self.etag(url), self.etag(url + '?after=x'))
+
+    def test_new_login_gets_fresh_csrf_token(self):
+        url = self.urls['post']
+        response = self.reader_client.get(url)
+        self.reader_client.force_login(self.reader)
+        repeat = self.reader_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(repeat.status_code, 200)
+        self.assertNotEqual(
+            repeat.context['csrf_token'], response.context['csrf_token']
+        )
+
+    def test_changes_update_etag(self):
+        changes = {
+            'post': lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий'
+            ),
+            'group': lambda: Post.objects.get(pk=self.post.pk).save(),
+            'profile': lambda: Follow.objects.create(
+                user=self.reader, author=self.author
+            ),
+        }
+        for name, change in changes.items():
+            with self.subTest(page=name):
+                url = self.urls[name]
+                before = self.etag(url)
+                self.assertEqual(self.etag(url), before)
+                change()
+                self.assertNotEqual(self.etag(url), before)
+
+    def test_renamed_group_updates_other_pages(self):
+        before = self.etag(self.urls['profile'])
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertNotEqual(self.etag(self.urls['profile']), before)
+
+    def test_renamed_author_updates_other_pages(self):
+        before = {name: self.etag(url) for name, url in self.urls.items()}
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = 'Лев'
+        author.save()
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                self.assertNotEqual(self.etag(url), before[name])
+
+    def test_saves_without_renames_keep_etag(self):
+        before = {name: self.etag(url) for name, url in self.urls.items()}
+        User.objects.create_user(username='newcomer')
+        reader = User.objects.get(pk=self.reader.pk)
+        reader.set_password('secret')
+        reader.save()
+        author = User.objects.get(pk=self.author.pk)
+        author.save()
+        author.save(update_fields=['last_login'])
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                self.assertEqual(self.etag(url), before[name])
+
+    def test_missing_page_has_no_validators(self):
+        response = self.client.get(reverse('posts:group_list', args=('no',)))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
@@ -0,0 +1,82 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Post, User, UserStats
+
+
+class CountersTests(TestCase):
+    """Тестирование денормализованных счётчиков"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='test post')
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_signals(self):
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        comment = Comment.objects.create(
+            post=self.post, author=self.reader, text='test comment'
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        follow.delete()
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+        Post.objects.create(author=self.author, text='other post').delete()
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+
+    def test_user_delete_cascades(self):
+        Follow.objects.create(user=self.author, author=self.reader)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='test comment'
+        )
+        self.author.delete()
+        self.assertFalse(UserStats.objects.filter(user_id=self.author.id))
+        self.assertEqual(self.stats(self.reader).followers_count, 0)
+
+    def test_reconcile_fixes_drift(self):
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'bulk {i}') for i in range(3)
+        )
+        UserStats.objects.filter(user=self.reader).delete()
+        Post.objects.filter(pk=self.post.pk).update(comments_count=5)
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('пользователей: 2, постов: 1', out.getvalue())
+        self.assertEqual(self.stats(self.author).posts_count, 4)
+        self.assertEqual(self.stats(self.reader).posts_count, 0)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_pages_do_not_aggregate(self):
+        client = Client()
+        client.force_login(self.reader)
+        urls = (
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            reverse(
+                'posts:profile', kwargs={'username': self.author.username}
+            ),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = client.get(url)
+                self.assertFalse(
+                    [q for q in queries if 'COUNT(' in q['sql']]
+                )
+                self.assertContains(response, 'Всего постов')
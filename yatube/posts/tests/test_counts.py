@@ -0,0 +1,94 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import counts
+from ..models import Follow, Group, Post, User
+
+
+class PostCountsTests(TestCase):
+    """Тестирование закэшированных счётчиков постов"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        cls.group = Group.objects.create(
+            title='test group',
+            slug='test',
+            description='test description',
+        )
+        cls.other_group = Group.objects.create(
+            title='other group',
+            slug='other',
+            description='other description',
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, group=cls.group, text=f'Test post {i}')
+            for i in range(15)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def count(self, scope):
+        return counts.scope_count(scope, Post.objects.none())
+
+    def test_counts_are_cached(self):
+        group_scope = counts.group_scope(self.group.id)
+        self.assertEqual(
+            counts.scope_count(group_scope, self.group.posts.all()),
+            (15, True),
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(self.count(group_scope), (15, True))
+
+    def test_counts_follow_post_signals(self):
+        scopes = {
+            counts.global_scope(): Post.objects.all(),
+            counts.group_scope(self.group.id): self.group.posts.all(),
+            counts.group_scope(self.other_group.id):
+                self.other_group.posts.all(),
+        }
+        for scope, posts in scopes.items():
+            counts.scope_count(scope, posts)
+        post = Post.objects.create(
+            author=self.user, group=self.group, text='new'
+        )
+        self.assertEqual(self.count(counts.global_scope()), (16, True))
+        self.assertEqual(
+            self.count(counts.group_scope(self.group.id)), (16, True)
+        )
+        post.group = self.other_group
+        post.save()
+        self.assertEqual(
+            self.count(counts.group_scope(self.group.id)), (15, True)
+        )
+        self.assertEqual(
+            self.count(counts.group_scope(self.other_group.id)), (1, True)
+        )
+        post.delete()
+        self.assertEqual(self.count(counts.global_scope()), (15, True))
+        self.assertEqual(
+            self.count(counts.group_scope(self.other_group.id)), (0, True)
+        )
+
+    def test_follow_count_sums_authors(self):
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(counts.follow_count(self.reader), (15, True))
+        with self.assertNumQueries(1):
+            self.assertEqual(counts.follow_count(self.reader), (15, True))
+
+    @override_settings(PAGINATOR_EXACT_COUNT_LIMIT=12)
+    def test_estimate_when_too_many(self):
+        scope = counts.global_scope()
+        self.assertEqual(
+            counts.scope_count(scope, Post.objects.all()), (12, False)
+        )
+        self.assertEqual(self.count(scope), (12, False))
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(response, 'Много страниц')
@@ -0,0 +1,113 @@
+import csv
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import exporting
+from ..models import Comment, Group, Post, User
+
+
+class ExportTests(TestCase):
+    """Тестирование потоковой выгрузки постов и комментариев"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test', description='Описание'
+        )
+        Post.objects.bulk_create(
+            Post(
+                author=cls.author,
+                group=cls.group if i % 2 else None,
+                text=f'Пост {i}',
+            )
+            for i in range(10)
+        )
+        Post.objects.create(author=cls.other, text='Чужой пост')
+        cls.post = Post.objects.filter(author=cls.author).first()
+        Comment.objects.create(
+            post=cls.post, author=cls.author, text='Комментарий, с запятой'
+        )
+
+    def client_for(self, user):
+        client = Client()
+        client.force_login(user)
+        return client
+
+    def export(self, client, url, **params):
+        response = client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_author_exports_own_posts(self):
+        url = reverse('posts:profile_export', args=['author'])
+        content = self.export(self.client_for(self.author), url)
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(
+            [row['text'] for row in rows], [f'Пост {i}' for i in range(10)]
+        )
+        self.assertEqual(rows[1]['group'], 'test')
+        self.assertIsNone(rows[0]['group'])
+        self.assertEqual(set(rows[0]), set(exporting.POST_FIELDS))
+
+    def test_comments_csv(self):
+        url = reverse('posts:profile_export', args=['author'])
+        content = self.export(
+            self.client_for(self.author), url, kind='comments', format='csv'
+        )
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['text'], 'Комментарий, с запятой')
+        self.assertEqual(rows[0]['post'], str(self.post.pk))
+
+    def test_permissions(self):
+        profile_url = reverse('posts:profile_export', args=['author'])
+        group_url = reverse('posts:group_export', args=['test'])
+        cases = (
+            (self.other, profile_url, 403),
+            (self.staff, profile_url, 200),
+            (self.author, group_url, 403),
+            (self.staff, group_url, 200),
+        )
+        for user, url, status in cases:
+            with self.subTest(user=user.username, url=url):
+                response = self.client_for(user).get(url)
+                self.assertEqual(response.status_code, status)
+        response = self.client.get(profile_url)
+        self.assertEqual(response.status_code, 302)
+        response = self.client_for(self.author).get(
+            profile_url, {'format': 'xml'}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_group_export(self):
+        url = reverse('posts:group_export', args=['test'])
+        content = self.export(self.client_for(self.staff), url)
+        self.assertEqual(len(content.splitlines()), 5)
+
+    def test_keyset_batches(self):
+        posts = Post.objects.filter(author=self.author)
+        with self.assertNumQueries(4):
+            rows = list(exporting.rows('posts', posts, batch_size=3))
+        self.assertEqual(len(rows), 10)
+        ids = [row['id'] for row in rows]
+        self.assertEqual(ids, sorted(ids))
+
+    def test_command(self):
+        stdout = StringIO()
+        call_command('export_posts', author='author', stdout=stdout)
+        self.assertEqual(len(stdout.getvalue().splitlines()), 10)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'group.csv')
+            call_command(
+                'export_posts', group='test', format='csv', output=path
+            )
+            with open(path, encoding='utf-8', newline='') as source:
+                self.assertEqual(len(list(csv.DictReader(source))), 5)
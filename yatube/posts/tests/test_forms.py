@@ -4,6 +4,7 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 
 from django.test import Client
 from ..models import Post, Comment
+from ..storage import image_storage
 from .fixture import Fixture
 from django.urls import reverse
 
@@ -46,7 +47,9 @@ class TestForms(Fixture):
             Post.objects.filter(
                 text=form_data['text'],
                 group=form_data['group'],
-                image__contains='posts/test.gif',
+                image=image_storage.hashed_name(
+                    'posts/test.gif', self.uploaded
+                ),
             ).exists()
         )
 
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+
+from .. import fulltext, timelines
+from ..models import Follow, Group, Post, TimelineEntry, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImportPostsTests(TestCase):
+    """Тестирование импорта постов из JSONL и CSV"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test', description='Описание'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.dir, name)
+        with open(path, 'w', encoding='utf-8') as target:
+            target.write(content)
+        return path
+
+    def jsonl(self, records):
+        return self.write(
+            'posts.jsonl',
+            ''.join(json.dumps(record) + '\n' for record in records),
+        )
+
+    def run_import(self, path, **options):
+        call_command(
+            'import_posts', path, batch_size=2, stdout=StringIO(), **options
+        )
+
+    def test_import_jsonl(self):
+        path = self.jsonl([
+            {'author': 'author', 'text': 'Первый', 'group': 'test',
+             'pub_date': '2021-05-01T10:00:00'},
+            {'author': 'author', 'text': 'Второй'},
+            {'author': 'nobody', 'text': 'Без автора'},
+            {'author': 'author', 'text': 'Чужая группа', 'group': 'missing'},
+            {'author': 'author', 'text': ''},
+        ])
+        self.run_import(path)
+        self.assertEqual(
+            set(Post.objects.values_list('text', flat=True)),
+            {'Первый', 'Второй'},
+        )
+        post = Post.objects.get(text='Первый')
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(
+            post.pub_date, datetime(2021, 5, 1, 10, tzinfo=timezone.utc)
+        )
+        self.author.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.posts_count, 2)
+        self.assertFalse(Post.objects.filter(fanned_out=False).exists())
+
+    def test_new_posts_fanned_out_and_indexed(self):
+        legacy = Post.objects.create(author=self.author, text='Старый пост')
+        Post.objects.filter(pk=legacy.pk).update(fanned_out=False)
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.author)
+        path = self.jsonl([
+            {'author': 'author', 'text': f'Импортный пост {i}'}
+            for i in range(3)
+        ])
+        fan_out_author = mock.Mock(wraps=timelines.fan_out_author)
+        with mock.patch.object(fulltext, 'rebuild') as rebuild, \
+                mock.patch.object(timelines, 'fan_out_author', fan_out_author):
+            self.run_import(path)
+        rebuild.assert_not_called()
+        self.assertEqual(fan_out_author.call_count, 2)
+        imported = Post.objects.filter(text__startswith='Импортный')
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(user=reader).values_list(
+                'post_id', flat=True
+            )),
+            set(imported.values_list('id', flat=True)),
+        )
+        self.assertFalse(Post.objects.get(pk=legacy.pk).fanned_out)
+        self.assertEqual(
+            {post_id for post_id, rank in fulltext.ranked('импортный')},
+            set(imported.values_list('id', flat=True)),
+        )
+
+    def test_import_csv_creates_authors(self):
+        path = self.write(
+            'posts.csv',
+            'author,text,group\nnewbie,"Текст, с запятой",test\n'
+            'author,Ещё пост,\n',
+        )
+        self.run_import(path, create_authors=True)
+        newbie = User.objects.get(username='newbie')
+        self.assertFalse(newbie.has_usable_password())
+        self.assertTrue(
+            Post.objects.filter(
+                author=newbie, text='Текст, с запятой', group=self.group
+            ).exists()
+        )
+        self.assertEqual(Post.objects.count(), 2)
+
+    def test_resume_after_broken_record(self):
+        records = [
+            json.dumps({'author': 'author', 'text': f'Пост {i}'})
+            for i in range(7)
+        ]
+        broken = records[:5] + ['{не json'] + records[5:]
+        path = self.write('posts.jsonl', '\n'.join(broken) + '\n')
+        with self.assertRaises(CommandError):
+            self.run_import(path)
+        self.assertEqual(Post.objects.count(), 4)
+        with self.assertRaises(CommandError):
+            self.run_import(path)
+        self.write('posts.jsonl', '\n'.join(records) + '\n')
+        self.run_import(path, resume=True)
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            [f'Пост {i}' for i in range(7)],
+        )
+
+    def test_copy_images(self):
+        with open(os.path.join(self.dir, 'picture.gif'), 'wb') as image:
+            image.write(b'GIF89a')
+        path = self.jsonl([
+            {'author': 'author', 'text': 'С картинкой',
+             'image': 'picture.gif'},
+            {'author': 'author', 'text': 'Без файла', 'image': 'lost.gif'},
+        ])
+        self.run_import(path, images_dir=self.dir, skip_index=True)
+        post = Post.objects.get(text='С картинкой')
+        digest = hashlib.sha256(b'GIF89a').hexdigest()
+        self.assertEqual(post.image.name, f'posts/{digest[:2]}/{digest}.gif')
+        self.assertTrue(os.path.exists(post.image.path))
+        self.assertEqual(Post.objects.get(text='Без файла').image, '')
@@ -0,0 +1,127 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+# SCAN — проход по всей таблице или всему индексу, в отличие от SEARCH.
+FULL_SCAN = re.compile(r'^SCAN (?!\(?subquery)(?!.*VIRTUAL TABLE)')
+TEMP_SORT = re.compile(r'^USE TEMP B-TREE FOR .*ORDER BY')
+# Запросы, которым сортировка во временном B-дереве разрешена: число
+# сортируемых строк в них ограничено. Лента подписок сливает окна
+# источников, каждое не длиннее страницы; поиск сортирует по rank
+# совпадения FTS5, rank вычисляется только при сопоставлении.
+BOUNDED_SORTS = {
+    'posts:follow_index': re.compile(
+        r'"posts_post"\."id" IN \(SELECT .* LIMIT \d+\)'
+    ),
+    'posts:search': re.compile(r'posts_post_search MATCH .* LIMIT \d+$'),
+}
+
+
+@override_settings(PAGINATOR_ITEMS_ON_PAGE=5)
+class FeedIndexesTests(TestCase):
+    """Запросы лент идут по индексам, без полного прохода и сортировки"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='test group',
+            slug='test',
+            description='test description',
+        )
+        authors = [
+            User.objects.create_user(username=f'author{i}')
+            for i in range(3)
+        ]
+        for author in authors:
+            Follow.objects.create(user=cls.reader, author=author)
+        for i in range(30):
+            Post.objects.create(
+                author=authors[i % len(authors)],
+                group=cls.group,
+                text=f'Test post {i}',
+            )
+        cls.post = Post.objects.first()
+        Comment.objects.create(post=cls.post, author=cls.reader, text='Тест')
+        cls.expected_indexes = {
+            reverse('posts:index'): 'post_date_idx',
+            reverse(
+                'posts:group_list', kwargs={'slug': cls.group.slug}
+            ): 'post_group_date_idx',
+            reverse(
+                'posts:profile', kwargs={'username': authors[0].username}
+            ): 'post_author_date_idx',
+            reverse('posts:follow_index'): 'timeline_user_date_idx',
+            reverse(
+                'posts:post_detail', kwargs={'post_id': cls.post.id}
+            ): 'comment_post_created_idx',
+            reverse('posts:search'): 'posts_post_search',
+        }
+        cls.search_data = {'q': 'post'}
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def plans(self, url, data=None):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plans.append(
+                    (query['sql'], [row[-1] for row in cursor.fetchall()])
+                )
+        return response, plans
+
+    def check(self, url, index, data=None):
+        response, plans = self.plans(url, data)
+        bounded = BOUNDED_SORTS.get(response.resolver_match.view_name)
+        for sql, plan in plans:
+            if not any(TEMP_SORT.match(step) for step in plan):
+                continue
+            self.assertTrue(
+                bounded is not None and bounded.search(sql),
+                f'{sql}\n{plan}',
+            )
+            self.assertFalse(
+                any(FULL_SCAN.match(step) for step in plan),
+                f'{sql}\n{plan}',
+            )
+        self.assertTrue(
+            any(index in step for _, plan in plans for step in plan),
+            f'{index} не используется: {plans}',
+        )
+        return response
+
+    def test_feeds_use_indexes(self):
+        for url, index in self.expected_indexes.items():
+            with self.subTest(url=url):
+                data = self.search_data if 'search' in url else {}
+                response = self.check(url, index, data)
+                page_obj = response.context.get('page_obj')
+                if page_obj is None or not page_obj.paginator.has_next:
+                    continue
+                self.check(url, index, {
+                    **data, 'after': page_obj.paginator.next_cursor,
+                })
+
+    def test_followers_lookup_uses_index(self):
+        with connection.cursor() as cursor:
+            sql, params = (
+                Follow.objects.filter(author=self.post.author_id)
+                .values_list('user_id').query.sql_with_params()
+            )
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = [row[-1] for row in cursor.fetchall()]
+        self.assertIn('follow_author_idx', ' '.join(plan))
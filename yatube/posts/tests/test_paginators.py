@@ -0,0 +1,89 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post, User
+from ..paginators import CursorPaginator
+
+
+class CursorPaginatorTests(TestCase):
+    """Тестирование постраничного вывода по курсору"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Test post {i}') for i in range(25)
+        )
+        # Одинаковая дата публикации: порядок задаёт id.
+        Post.objects.filter(id__lte=10).update(
+            pub_date=Post.objects.get(id=1).pub_date
+        )
+        cls.expected = list(
+            Post.objects.order_by('-pub_date', '-id').values_list(
+                'id', flat=True
+            )
+        )
+
+    def get_page(self, **cursors):
+        paginator = CursorPaginator(Post.objects.all(), 10, **cursors)
+        return paginator, paginator.get_page()
+
+    def test_walk_forward_and_back(self):
+        seen = []
+        pages = []
+        after = None
+        while True:
+            paginator, page = self.get_page(after=after)
+            seen.extend(post.id for post in page)
+            pages.append(paginator)
+            if not paginator.has_next:
+                break
+            after = paginator.next_cursor
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(len(pages), 3)
+        self.assertFalse(pages[0].has_previous)
+
+        seen = []
+        before = pages[-1].previous_cursor
+        while before:
+            paginator, page = self.get_page(before=before)
+            seen[:0] = [post.id for post in page]
+            self.assertTrue(paginator.has_next)
+            before = paginator.previous_cursor
+        self.assertEqual(seen, self.expected[:20])
+
+    def test_bad_cursor_returns_first_page(self):
+        for token in ('garbage', 'WzEsMiwzXQ', 'WyJ4IiwgMV0'):
+            with self.subTest(token=token):
+                paginator, page = self.get_page(after=token)
+                self.assertEqual(
+                    [post.id for post in page], self.expected[:10]
+                )
+
+    def test_deep_page_costs_as_first(self):
+        first, page = self.get_page()
+        with self.assertNumQueries(1):
+            list(page)
+        deep, page = self.get_page(after=first.next_cursor)
+        with self.assertNumQueries(1):
+            list(page)
+            deep.next_cursor
+
+    @override_settings(PAGINATOR_ITEMS_ON_PAGE=10)
+    def test_view_links(self):
+        cache.clear()
+        response = Client().get(reverse('posts:index'))
+        paginator = response.context['page_obj'].paginator
+        self.assertContains(response, f'?after={paginator.next_cursor}')
+        response = Client().get(
+            reverse('posts:index'), {'after': paginator.next_cursor}
+        )
+        self.assertEqual(
+            [post.id for post in response.context['page_obj']],
+            self.expected[10:20],
+        )
+        self.assertContains(
+            response,
+            f'?before={response.context["page_obj"].paginator.previous_cursor}'
+        )
@@ -0,0 +1,63 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Group, Post, User
+
+
+class FeedQueriesTests(TestCase):
+    """Число запросов ленты не зависит от размера страницы"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='test group',
+            slug='test',
+            description='test description',
+        )
+        authors = [
+            User.objects.create_user(username=f'author{i}')
+            for i in range(5)
+        ]
+        for author in authors:
+            Follow.objects.create(user=cls.reader, author=author)
+        cls.author = authors[0]
+        Post.objects.bulk_create(
+            Post(
+                author=authors[i % len(authors)],
+                group=cls.group,
+                text=f'Test post {i}',
+            )
+            for i in range(30)
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.author, group=cls.group, text=f'Author post {i}')
+            for i in range(30)
+        )
+        cls.budgets = {
+            reverse('posts:index'): 4,
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}): 5,
+            reverse(
+                'posts:profile',
+                kwargs={'username': cls.author.username}
+            ): 5,
+            reverse('posts:follow_index'): 5,
+        }
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_feed_query_budget(self):
+        for page_size in (5, 10, 20):
+            for url, budget in self.budgets.items():
+                with self.subTest(url=url, page_size=page_size):
+                    cache.clear()
+                    with override_settings(
+                        PAGINATOR_ITEMS_ON_PAGE=page_size
+                    ), self.assertNumQueries(budget):
+                        response = self.client.get(url)
+                    self.assertEqual(
+                        len(response.context['page_obj']), page_size
+                    )
@@ -0,0 +1,112 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import fulltext
+from ..models import Post, User
+
+
+class SearchTests(TestCase):
+    """Тестирование полнотекстового поиска"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        cls.rare = Post.objects.create(
+            author=cls.user, text='Один котик среди прочего текста'
+        )
+        cls.often = Post.objects.create(
+            author=cls.user, text='Котик, котик и ещё раз котик'
+        )
+        cls.other = Post.objects.create(author=cls.user, text='Про собак')
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('posts:search')
+
+    def found(self, query, **params):
+        response = Client().get(self.url, {'q': query, **params})
+        return response, [post.id for post in response.context['page_obj']]
+
+    def test_ranked_results(self):
+        response, ids = self.found('КОТИК')
+        self.assertEqual(ids, [self.often.id, self.rare.id])
+        self.assertTemplateUsed(response, 'posts/search.html')
+
+    def test_index_follows_changes(self):
+        other = Post.objects.get(id=self.other.id)
+        other.text = 'Про котика'
+        other.save()
+        self.assertEqual(self.found('собак')[1], [])
+        self.assertEqual(self.found('котика')[1], [other.id])
+        Post.objects.get(id=self.often.id).delete()
+        self.assertEqual(self.found('котик')[1], [self.rare.id])
+
+    def test_operators_are_not_parsed(self):
+        for query in ('котик" OR собак', 'NEAR(котик', '*', 'котик AND'):
+            with self.subTest(query=query):
+                response = Client().get(self.url, {'q': query})
+                self.assertEqual(response.status_code, 200)
+
+    def test_empty_query(self):
+        response = Client().get(self.url)
+        self.assertIsNone(response.context['page_obj'])
+
+    @override_settings(PAGINATOR_ITEMS_ON_PAGE=10)
+    def test_cursor_pages(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text='котик ' * (i % 4 + 1))
+            for i in range(25)
+        )
+        out = StringIO()
+        call_command('rebuild_search', batch_size=7, stdout=out)
+        self.assertIn('28', out.getvalue())
+        seen = []
+        params = {}
+        while True:
+            response, ids = self.found('котик', **params)
+            seen.extend(ids)
+            paginator = response.context['page_obj'].paginator
+            self.assertEqual(paginator.count, 27)
+            if not paginator.has_next:
+                break
+            self.assertContains(
+                response, 'q=%D0%BA%D0%BE%D1%82%D0%B8%D0%BA&after='
+            )
+            params = {'after': paginator.next_cursor}
+        self.assertEqual(len(seen), 27)
+        self.assertEqual(len(set(seen)), 27)
+        self.assertNotIn(self.other.id, seen)
+
+    @override_settings(PAGINATOR_ITEMS_ON_PAGE=2)
+    def test_pages_come_from_index(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text='котик ' * (i % 3 + 1))
+            for i in range(5)
+        )
+        fulltext.rebuild(100)
+        expected = [pk for pk, rank in fulltext.ranked('котик')]
+        with self.assertNumQueries(3):
+            response, ids = self.found('котик')
+        self.assertEqual(ids, expected[:2])
+        paginator = response.context['page_obj'].paginator
+        response, ids = self.found('котик', after=paginator.next_cursor)
+        self.assertEqual(ids, expected[2:4])
+        paginator = response.context['page_obj'].paginator
+        response, ids = self.found(
+            'котик', before=paginator.previous_cursor
+        )
+        self.assertEqual(ids, expected[:2])
+
+    def test_failed_rebuild_keeps_index(self):
+        with mock.patch.object(
+            Post.objects, 'filter', side_effect=RuntimeError
+        ), self.assertRaises(RuntimeError):
+            fulltext.rebuild(100)
+        self.assertEqual(
+            self.found('котик')[1], [self.often.id, self.rare.id]
+        )
@@ -0,0 +1,99 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Count, F
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import counts
+from ..models import Comment, Follow, Group, Post, TimelineEntry, User
+from ..seeding import Seeder
+
+
+class SeedingTests(TestCase):
+    """Тестирование генератора синтетических данных"""
+    def test_seeder_shape(self):
+        seeder = Seeder(seed=1, batch_size=7)
+        user_ids = seeder.users(30)
+        group_ids = seeder.groups(3)
+        post_ids = seeder.posts(300, user_ids, group_ids, skew=1.2)
+        seeder.comments(100, post_ids, user_ids, skew=1.0)
+        seeder.follows(5, user_ids, skew=1.2)
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertEqual(Follow.objects.count(), 30 * 5)
+        self.assertFalse(Follow.objects.filter(
+            user_id=F('author_id')
+        ).exists())
+        per_author = sorted(
+            User.objects.annotate(total=Count('posts'))
+            .values_list('total', flat=True),
+            reverse=True,
+        )
+        self.assertGreater(per_author[0], 5 * per_author[len(per_author) // 2])
+        self.assertTrue(Post.objects.filter(group=None).exists())
+        self.assertTrue(Post.objects.exclude(group=None).exists())
+        dates = list(
+            Post.objects.order_by('id').values_list('pub_date', flat=True)
+        )
+        self.assertEqual(dates, sorted(dates))
+        self.assertEqual(len(set(dates)), len(dates))
+
+    def test_seeder_is_reproducible(self):
+        def snapshot():
+            return list(
+                Post.objects.order_by('id')
+                .values_list('author_id', 'group_id', 'text')
+            )
+
+        seeder = Seeder(seed=3)
+        seeder.posts(50, seeder.users(10), seeder.groups(2), skew=1.1)
+        first = snapshot()
+        Post.objects.all().delete()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        seeder = Seeder(seed=3)
+        seeder.posts(50, seeder.users(10), seeder.groups(2), skew=1.1)
+        self.assertEqual(snapshot(), first)
+
+    def test_command_rebuilds_derived_data(self):
+        call_command(
+            'seed', users=10, groups=2, posts=60, comments=40, follows=3,
+            stdout=StringIO(),
+        )
+        self.assertEqual(Post.objects.count(), 60)
+        author = User.objects.order_by('-stats__posts_count').first()
+        self.assertEqual(author.stats.posts_count, author.posts.count())
+        self.assertFalse(Post.objects.filter(fanned_out=False).exists())
+        follow = Follow.objects.first()
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=follow.user).count(),
+            Post.objects.filter(author__following__user=follow.user).count(),
+        )
+        post = Post.objects.create(author=author, text='после сида')
+        self.assertGreater(post.pk, 60)
+
+    def test_command_forgets_stale_caches(self):
+        cache.clear()
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, text='до сида')
+        self.client.get(reverse('posts:index'))
+        scope = counts.global_scope()
+        self.assertEqual(
+            counts.scope_count(scope, Post.objects.all()), (1, True)
+        )
+        call_command(
+            'seed', users=5, groups=1, posts=20, comments=0, follows=1,
+            skip_rebuild=True, stdout=StringIO(),
+        )
+        self.assertEqual(
+            counts.scope_count(scope, Post.objects.all()), (21, True)
+        )
+        response = self.client.get(reverse('posts:index'))
+        seeded = Post.objects.exclude(author=author).latest('pub_date')
+        self.assertContains(
+            response, reverse('posts:post_detail', args=(seeded.id,))
+        )
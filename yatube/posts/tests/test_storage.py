@@ -0,0 +1,84 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from .. import blobs, thumbnails
+from ..models import MediaBlob, Post, User
+from ..storage import image_storage
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ContentAddressedStorageTests(TestCase):
+    """Тестирование хранения картинок по хешу содержимого"""
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        patcher = mock.patch.object(
+            blobs.transaction, 'on_commit', side_effect=lambda func: func()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def save(self, name='posts/small.gif', content=SMALL_GIF):
+        return image_storage.save(name, ContentFile(content))
+
+    def post(self, image):
+        return Post.objects.create(
+            author=self.author, text='Пост', image=image
+        )
+
+    def test_same_content_stored_once(self):
+        name = self.save()
+        self.assertRegex(name, r'^posts/([0-9a-f]{2})/\1[0-9a-f]{62}\.gif$')
+        self.assertEqual(self.save('posts/copy.GIF'), name)
+        self.assertNotEqual(self.save(content=SMALL_GIF + b'\0'), name)
+        directory = name.rsplit('/', 1)[0]
+        self.assertEqual(len(image_storage.listdir(directory)[1]), 1)
+
+    def test_file_removed_with_last_reference(self):
+        name = self.save()
+        first, second = self.post(name), self.post(name)
+        thumbnails.generate(name)
+        thumbnail = thumbnails.thumbnail_file(name, 'preview')
+        self.assertEqual(blobs.refs(name), 2)
+        first.image = ''
+        first.save()
+        self.assertEqual(blobs.refs(name), 1)
+        self.assertTrue(image_storage.exists(name))
+        second.delete()
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+        self.assertFalse(image_storage.exists(name))
+        self.assertFalse(thumbnail.exists())
+
+    def test_author_cascade_releases_images(self):
+        name = self.save()
+        self.post(name)
+        self.author.delete()
+        self.assertEqual(blobs.refs(name), 0)
+        self.assertFalse(image_storage.exists(name))
+
+    def test_retained_again_before_removal(self):
+        name = self.save()
+        blobs.retain([name])
+        with mock.patch.object(blobs.transaction, 'on_commit') as on_commit:
+            blobs.release([name])
+        blobs.retain([name])
+        on_commit.call_args[0][0]()
+        self.assertTrue(image_storage.exists(name))
@@ -0,0 +1,193 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from .. import thumbnails
+from .fixture import Fixture
+
+
+class ThumbnailsTests(Fixture):
+    """Тестирование фоновой подготовки миниатюр"""
+    def setUp(self):
+        cache.clear()
+        self.image = self.post_with_group_1.image
+
+    def test_enqueue_generates_all_variants(self):
+        files = [
+            thumbnails.thumbnail_file(self.image.name, 'preview', *variant)
+            for variant in thumbnails.variants()
+        ]
+        self.assertFalse(any(file.exists() for file in files))
+        # При THUMBNAIL_WORKERS = 0 миниатюры создаются сразу.
+        thumbnails.enqueue(self.image.name)
+        for file in files:
+            self.assertTrue(file.exists())
+            self.assertIsNotNone(thumbnails.default.kvstore.get(file))
+
+    def test_page_renders_signed_urls(self):
+        with mock.patch.object(thumbnails, 'get_thumbnail') as create:
+            response = Client().get(self.reverse_post_detail)
+        create.assert_not_called()
+        self.assertContains(
+            response, thumbnails.signed_url(self.image.name, 'preview')
+        )
+
+    def test_no_image(self):
+        post = self.posts_without_group[0]
+        self.assertIsNone(thumbnails.picture(post, 'preview')['image'])
+
+    def test_worker_error_is_logged(self):
+        with mock.patch.object(
+            thumbnails, 'get_thumbnail', side_effect=OSError
+        ), self.assertLogs('posts.thumbnails', 'ERROR'):
+            thumbnails.enqueue(self.image.name)
+        self.assertNotIn(self.image.name, thumbnails._pending)
+
+
+@override_settings(THUMBNAIL_FORMATS=('PNG',))
+class ThumbnailVariantsTests(Fixture):
+    """Тестирование вариантов миниатюр и выбора формата по Accept.
+
+    WebP и AVIF есть не в каждой сборке Pillow, поэтому дополнительным
+    форматом в тестах служит PNG.
+    """
+    def setUp(self):
+        cache.clear()
+        self.post = self.post_with_group_1
+
+    def test_picture_lists_densities_and_formats(self):
+        picture = thumbnails.picture(self.post, 'preview')
+        urls = {
+            (density, image_format): thumbnails.signed_url(
+                self.post.image.name, 'preview', density, image_format
+            )
+            for density, image_format in thumbnails.variants()
+        }
+        self.assertEqual(
+            picture['srcset'],
+            f'{urls[(1, None)]} 1x, {urls[(2, None)]} 2x',
+        )
+        self.assertEqual(picture['sources'], [{
+            'type': 'image/png',
+            'srcset': f'{urls[(1, "PNG")]} 1x, {urls[(2, "PNG")]} 2x',
+        }])
+        self.assertEqual(
+            (picture['image']['width'], picture['image']['height']),
+            (100, 100),
+        )
+        response = self.client.get(self.reverse_post_detail)
+        self.assertContains(response, '<source type="image/png"')
+
+    def test_accepted_formats(self):
+        self.assertEqual(
+            thumbnails.accepted_formats('image/png;q=0.8,*/*'), ['PNG']
+        )
+        self.assertEqual(thumbnails.accepted_formats('*/*'), [])
+        self.assertEqual(
+            thumbnails.accepted_formats('image/png;q=0,*/*'), []
+        )
+
+    def test_view_picks_smallest_accepted(self):
+        name = self.post.image.name
+        sizes = {
+            image_format: thumbnail.storage.size(thumbnail.name)
+            for image_format in (None, 'PNG')
+            for thumbnail in [thumbnails.create(
+                name, *thumbnails.variant_options('preview', 2, image_format)
+            )]
+        }
+        smallest = 'image/png' if sizes['PNG'] < sizes[None] else (
+            'image/jpeg'
+        )
+        url = thumbnails.signed_url(name, 'preview', 2)
+        for accept, content_type in (
+            ('*/*', 'image/jpeg'), ('image/png,*/*', smallest),
+        ):
+            with self.subTest(accept=accept):
+                response = self.client.get(url, HTTP_ACCEPT=accept)
+                self.assertEqual(response['Content-Type'], content_type)
+                self.assertIn('Accept', response['Vary'])
+                response.close()
+
+    def test_explicit_format_is_kept(self):
+        url = thumbnails.signed_url(self.post.image.name, 'preview', 1, 'PNG')
+        response = self.client.get(url, HTTP_ACCEPT='image/jpeg')
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertFalse(response.has_header('Vary'))
+        response.close()
+
+
+class SignedThumbnailTests(Fixture):
+    """Тестирование миниатюр по подписанным адресам"""
+    def setUp(self):
+        cache.clear()
+        self.name = self.post_with_group_1.image.name
+        self.url = thumbnails.signed_url(self.name, 'preview', 2)
+
+    def test_created_on_first_fetch(self):
+        thumbnail = thumbnails.thumbnail_file(self.name, 'preview', 2)
+        self.assertFalse(thumbnail.exists())
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('public', response['Cache-Control'])
+        self.assertEqual(
+            b''.join(response.streaming_content),
+            thumbnail.storage.open(thumbnail.name).read(),
+        )
+
+    def test_url_is_stable_over_time(self):
+        with mock.patch('django.core.signing.time.time', return_value=0):
+            first = thumbnails.signed_url(self.name, 'preview', 2)
+        with mock.patch(
+            'django.core.signing.time.time', return_value=24 * 60 * 60
+        ):
+            later = thumbnails.signed_url(self.name, 'preview', 2)
+        self.assertEqual(first, later)
+        self.assertEqual(first, self.url)
+
+    def test_bad_signature(self):
+        token = self.url.rstrip('/').rsplit('/', 1)[1]
+        for token in (token[:-1], 'garbage'):
+            with self.subTest(token=token):
+                response = self.client.get(
+                    reverse('posts:signed_thumbnail', args=(token,))
+                )
+                self.assertEqual(response.status_code, 404)
+
+    def test_concurrent_requests_decode_once(self):
+        name, geometry, options = thumbnails.unsign(
+            self.url.rstrip('/').rsplit('/', 1)[1]
+        )
+        created = []
+        thumbnail = thumbnails.thumbnail_file(self.name, 'preview', 2)
+
+        def slow_create(*args, **kwargs):
+            time.sleep(0.1)
+            created.append(args)
+            return thumbnail
+
+        results = []
+        with mock.patch.object(
+            thumbnails, 'get_thumbnail', side_effect=slow_create
+        ), mock.patch.object(
+            thumbnails.default.kvstore, 'get',
+            side_effect=lambda image_file: thumbnail if created else None,
+        ):
+            workers = [
+                threading.Thread(target=lambda: results.append(
+                    thumbnails.create(name, geometry, options)
+                ))
+                for _ in range(4)
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        self.assertEqual(len(created), 1)
+        self.assertEqual(results, [thumbnail] * 4)
+        self.assertEqual(thumbnails._key_locks, {})
@@ -0,0 +1,120 @@
+from importlib import import_module
+from io import StringIO
+from unittest import mock
+
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry, User
+
+
+class TimelineTests(TestCase):
+    """Тестирование материализованной ленты подписок"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.other_reader = User.objects.create_user(username='other_reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.star = User.objects.create_user(username='star')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Follow.objects.create(user=cls.reader, author=cls.star)
+        Follow.objects.create(user=cls.other_reader, author=cls.star)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def feed(self, **params):
+        response = self.client.get(reverse('posts:follow_index'), params)
+        return response.context['page_obj']
+
+    def test_new_post_is_fanned_out(self):
+        post = Post.objects.create(author=self.author, text='new post')
+        self.assertTrue(post.fanned_out)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertIn(post, self.feed().object_list)
+
+    def test_follow_backfills_and_unfollow_trims(self):
+        post = Post.objects.create(author=self.author, text='new post')
+        other = Client()
+        other.force_login(self.other_reader)
+        other.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.author.username}
+        ))
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.other_reader, post=post
+            ).exists()
+        )
+        other.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': self.author.username}
+        ))
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.other_reader).exists()
+        )
+
+    @override_settings(TIMELINE_FANOUT_MAX_FOLLOWERS=1)
+    def test_popular_author_is_merged_on_read(self):
+        star_post = Post.objects.create(author=self.star, text='star post')
+        post = Post.objects.create(author=self.author, text='new post')
+        self.assertFalse(star_post.fanned_out)
+        self.assertFalse(TimelineEntry.objects.filter(post=star_post).exists())
+        self.assertEqual(list(self.feed()), [post, star_post])
+
+    @override_settings(PAGINATOR_ITEMS_ON_PAGE=3)
+    def test_merged_pages_have_no_gaps(self):
+        Post.objects.bulk_create(
+            Post(author=self.star, text=f'legacy {i}') for i in range(4)
+        )
+        for i in range(4):
+            Post.objects.create(author=self.author, text=f'post {i}')
+        expected = list(
+            Post.objects.filter(author__in=[self.author, self.star])
+            .order_by('-pub_date', '-id')
+        )
+        seen = []
+        page = self.feed()
+        seen.extend(page)
+        while page.paginator.has_next:
+            page = self.feed(after=page.paginator.next_cursor)
+            seen.extend(page)
+        self.assertEqual(seen, expected)
+
+    def test_rebuild_timelines(self):
+        Post.objects.bulk_create(
+            Post(author=self.star, text=f'legacy {i}') for i in range(3)
+        )
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertFalse(Post.objects.filter(fanned_out=False).exists())
+        self.assertEqual(
+            TimelineEntry.objects.filter(post__author=self.star).count(), 6
+        )
+
+    @override_settings(TIMELINE_FANOUT_MAX_FOLLOWERS=1)
+    def test_migration_fans_out_legacy_posts(self):
+        Post.objects.bulk_create([
+            Post(author=self.author, text='legacy'),
+            Post(author=self.star, text='star legacy'),
+        ])
+        migration = import_module('posts.migrations.0020_unfanned_index')
+        with connection.cursor() as cursor:
+            migration.fan_out_legacy_posts(apps, mock.Mock(
+                connection=connection, execute=cursor.execute
+            ))
+        legacy = Post.objects.get(text='legacy')
+        self.assertTrue(legacy.fanned_out)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=legacy)
+            .exists()
+        )
+        self.assertFalse(Post.objects.get(text='star legacy').fanned_out)
+        self.assertEqual(
+            [post.text for post in self.feed()], ['star legacy', 'legacy']
+        )
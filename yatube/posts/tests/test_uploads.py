@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from PIL import Image
+from sorl.thumbnail import default
+
+from .. import thumbnails, uploads
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+ORIENTATION = 0x0112
+
+
+def photo(size, format='JPEG', orientation=None):
+    image = Image.new('RGB', size, (200, 30, 30))
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera'
+    if orientation:
+        exif[ORIENTATION] = orientation
+    buffer = BytesIO()
+    image.save(buffer, format, exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0, UPLOAD_WORKERS=0,
+    UPLOAD_MAX_SIDE=64, UPLOAD_QUALITY=80,
+)
+class UploadsTests(TestCase):
+    """Тестирование обработки загруженных картинок"""
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def save(self, name, content):
+        return default_storage.save(name, ContentFile(content))
+
+    def test_resizes_rotates_and_strips_exif(self):
+        name = self.save('posts/photo.jpg', photo((200, 100), orientation=6))
+        uploads.submit(name)
+        with Image.open(default_storage.path(name)) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (32, 64))
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_keeps_original_in_cold_directory(self):
+        originals = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, originals)
+        content = photo((200, 100), 'PNG')
+        name = self.save('posts/picture.png', content)
+        with override_settings(UPLOAD_ORIGINALS_DIR=originals):
+            uploads.submit(name)
+        with open(os.path.join(originals, name), 'rb') as original:
+            self.assertEqual(original.read(), content)
+        with Image.open(default_storage.path(name)) as image:
+            self.assertEqual(image.size, (64, 32))
+
+    def test_replaced_file_gets_new_thumbnails(self):
+        name = self.save('posts/edited.jpg', photo((200, 200)))
+        Post.objects.create(
+            author=User.objects.create_user(username='author'),
+            text='Пост',
+            image=name,
+        )
+        thumbnail = thumbnails.thumbnail_file(name, 'preview')
+        thumbnails.enqueue(name)
+        old = default.kvstore.get(thumbnail)
+        uploads.submit(name)
+        new = default.kvstore.get(thumbnail)
+        self.assertIsNotNone(new)
+        self.assertEqual(new.name, old.name)
+
+    def test_unsupported_file_is_kept(self):
+        name = self.save('posts/broken.jpg', b'not an image')
+        with self.assertLogs('posts.uploads', 'ERROR'):
+            uploads.submit(name)
+        with default_storage.open(name) as stored:
+            self.assertEqual(stored.read(), b'not an image')
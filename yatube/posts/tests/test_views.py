@@ -1,9 +1,13 @@
+from unittest import mock
+
 from django import forms
 from django.conf import settings
 from django.core import paginator
 from django.test import Client
 from django.urls import reverse
+from .. import cache_tags
 from ..models import Follow, Post
+from ..templatetags import articles
 from .fixture import Fixture
 from django.core.cache import cache
 
@@ -142,7 +146,7 @@ class ViewsTests(Fixture):
             self.reverse_group_list,
             self.reverse_profile,
         ]
-        post_with_image = Post.objects.filter(image__contains='posts/small')[1]
+        post_with_image = Post.objects.exclude(image='')[1]
         for reversed in check_list:
             with self.subTest(page=reversed):
                 response = self.auth_client.get(reversed)
@@ -178,29 +182,82 @@ class ViewsTests(Fixture):
 
     def test_cached_index(self):
         """Проверка, что главная страница кэшируется"""
-        response = self.auth_client.get(
-            reverse('posts:index')
+        cache.clear()
+        cached = self.auth_client.get(reverse('posts:index'))
+        first_post = cached.context['page_obj'][0]
+        Post.objects.filter(id=first_post.id).update(
+            text='Изменено в обход сигналов'
         )
+        response = self.auth_client.get(reverse('posts:index'))
+        self.assertEqual(cached.content, response.content)
+        cache.clear()
+        response = self.auth_client.get(reverse('posts:index'))
+        self.assertNotEqual(cached.content, response.content)
+
+    def test_cached_index_invalidated_on_save_and_delete(self):
+        """Кэш главной сбрасывается при создании и удалении поста"""
+        cache.clear()
+        self.auth_client.get(reverse('posts:index'))
         post = Post.objects.create(
             text='Проверяем кэширование страницы',
             author=self.user1,
         )
-        cached = self.auth_client.get(
-            reverse('posts:index')
-        )
+        response = self.auth_client.get(reverse('posts:index'))
+        self.assertContains(response, post.text)
+        post.text = 'Пост отредактирован'
+        post.save()
+        response = self.auth_client.get(reverse('posts:index'))
+        self.assertContains(response, post.text)
         post.delete()
-        response = self.auth_client.get(
-            reverse('posts:index')
-        )
+        response = self.auth_client.get(reverse('posts:index'))
+        self.assertNotContains(response, post.text)
+
+    def test_cached_index_edit_during_render(self):
+        """Правка во время отрисовки главной не остаётся в её кэше"""
+        cache.clear()
+        post = Post.objects.order_by('-pub_date', '-id').first()
+        render = articles._page_articles
+
+        def edit_after_render(context, page):
+            rendered = render(context, page)
+            Post.objects.filter(pk=post.pk).update(text='Правка')
+            cache_tags.invalidate(cache_tags.post_tag(post.pk))
+            return rendered
+
+        with mock.patch.object(
+            articles, '_page_articles', side_effect=edit_after_render
+        ):
+            self.auth_client.get(reverse('posts:index'))
+        response = self.auth_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Правка')
+
+    def test_cached_index_ignores_garbage_cursors(self):
+        """Мусорный курсор не заводит отдельную запись кэша главной"""
+        cache.clear()
+        self.auth_client.get(reverse('posts:index'))
+        keys = set(cache._cache)
+        for cursor in ('x1', 'x2', 'WzFd'):
+            response = self.auth_client.get(
+                reverse('posts:index'), {'after': cursor}
+            )
+            self.assertEqual(response.status_code, 200)
         self.assertEqual(
-            cached.content,
-            response.content
+            {key for key in cache._cache if 'posts:feed:' in key},
+            {key for key in keys if 'posts:feed:' in key},
         )
+
+    def test_cached_index_varies_on_page_and_auth(self):
+        """Кэш главной зависит от страницы и авторизации"""
         cache.clear()
-        response = self.auth_client.get(
-            reverse('posts:index')
+        first = self.auth_client.get(reverse('posts:index'))
+        paginator = first.context['page_obj'].paginator
+        second = self.auth_client.get(
+            reverse('posts:index'), {'after': paginator.next_cursor}
         )
-        self.assertNotEqual(cached.content, response.content)
+        self.assertNotEqual(first.content, second.content)
+        self.assertContains(first, reverse('posts:follow_index'))
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertNotContains(response, reverse('posts:follow_index'))
 
     def test_auth_user_can_follow_and_unfollow(self):
         self.auth_client_2.get(
@@ -0,0 +1,284 @@
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default
+from sorl.thumbnail.base import EXTENSIONS
+from sorl.thumbnail.conf import defaults as thumbnail_defaults
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.parsers import parse_geometry
+from sorl.thumbnail.shortcuts import get_thumbnail
+
+from core import timing
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_pending = set()
+_key_locks = {}
+_lock = threading.Lock()
+
+SIGNING_SALT = 'posts.thumbnails'
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+        return _executor
+
+
+def _options(source, options):
+    """Опции миниатюры в том виде, в каком их дополняет бэкенд sorl."""
+    backend = default.backend
+    options = dict(options)
+    if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(thumbnail_settings, attr)
+        if value != getattr(thumbnail_defaults, attr):
+            options.setdefault(key, value)
+    return options
+
+
+def formats():
+    """Дополнительные форматы миниатюр, которые умеет писать Pillow."""
+    Image.init()
+    supported = []
+    for image_format in settings.THUMBNAIL_FORMATS:
+        if image_format in Image.SAVE:
+            # sorl берёт расширение файла из своей таблицы форматов.
+            EXTENSIONS.setdefault(image_format, image_format.lower())
+            supported.append(image_format)
+    return supported
+
+
+def variants():
+    """Варианты миниатюры: (плотность, формат); None — основной формат."""
+    return [
+        (density, image_format)
+        for density in settings.THUMBNAIL_DENSITIES
+        for image_format in (None, *formats())
+    ]
+
+
+def _scaled(geometry, density):
+    return 'x'.join(
+        str(int(side) * density) if side else ''
+        for side in geometry.split('x')
+    )
+
+
+def variant_options(preset, density=1, image_format=None):
+    """Геометрия и опции sorl для варианта пресета."""
+    geometry, options = settings.THUMBNAIL_PRESETS[preset]
+    if image_format is not None:
+        options = {**options, 'format': image_format}
+    return _scaled(geometry, density), options
+
+
+def thumbnail_file(name, preset, density=1, image_format=None):
+    """Файл миниатюры пресета; само изображение не создаётся."""
+    return _thumbnail_file(
+        name, *variant_options(preset, density, image_format)
+    )
+
+
+def _thumbnail_file(name, geometry, options):
+    source = ImageFile(name)
+    filename = default.backend._get_thumbnail_filename(
+        source, geometry, _options(source, options)
+    )
+    return ImageFile(filename, default.storage)
+
+
+def generate(name):
+    """Создаёт все варианты всех пресетов; ошибки только логируются.
+
+    Заранее, после загрузки: первый показ страницы не будет ждать
+    миниатюр в ``create``.
+    """
+    try:
+        with timing.measure('thumbnail'):
+            for preset in settings.THUMBNAIL_PRESETS:
+                for variant in variants():
+                    geometry, options = variant_options(preset, *variant)
+                    get_thumbnail(name, geometry, **options)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', name)
+    finally:
+        with _lock:
+            _pending.discard(name)
+        if threading.current_thread() is not threading.main_thread():
+            connections.close_all()
+
+
+def enqueue(name):
+    """Ставит создание миниатюр в очередь, повторно — не ставит.
+
+    При THUMBNAIL_WORKERS = 0 миниатюры создаются сразу.
+    """
+    if not name:
+        return
+    with _lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+    if not settings.THUMBNAIL_WORKERS:
+        generate(name)
+        return
+    _get_executor().submit(generate, name)
+
+
+def refresh(name):
+    """Заменяет миниатюры файла, содержимое которого изменилось.
+
+    Старые миниатюры и записи о них удаляются, новые ставятся в очередь.
+    """
+    try:
+        default.kvstore.delete(ImageFile(name))
+    finally:
+        if threading.current_thread() is not threading.main_thread():
+            connections.close_all()
+    enqueue(name)
+
+
+def signed_url(name, preset, density=1, image_format=None):
+    """Подписанный адрес миниатюры: файл, геометрия и опции варианта.
+
+    Подпись не даёт клиенту заказать произвольную геометрию, а адрес
+    строится без обращения к kvstore и диску. Подпись без времени:
+    адрес варианта не меняется, и браузер берёт миниатюру из своего
+    кэша.
+    """
+    geometry, options = variant_options(preset, density, image_format)
+    data = json.dumps(
+        [name, geometry, options], sort_keys=True, separators=(',', ':')
+    )
+    token = signing.Signer(salt=SIGNING_SALT).sign(
+        signing.b64_encode(data.encode()).decode()
+    )
+    return reverse('posts:signed_thumbnail', args=(token,))
+
+
+def unsign(token):
+    """Файл, геометрия и опции из адреса; BadSignature, если подделан."""
+    data = signing.Signer(salt=SIGNING_SALT).unsign(token)
+    name, geometry, options = json.loads(signing.b64_decode(data.encode()))
+    return name, geometry, options
+
+
+@contextmanager
+def _key_lock(key):
+    """Блокировка одной миниатюры; запись удаляется с последним ждущим."""
+    with _lock:
+        entry = _key_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _lock:
+            entry[1] -= 1
+            if not entry[1]:
+                del _key_locks[key]
+
+
+def create(name, geometry, options):
+    """Миниатюра по параметрам адреса; создаётся при первом запросе.
+
+    Одновременные запросы одной миниатюры ждут друг друга, и исходник
+    декодируется один раз: дождавшись блокировки, запрос находит в
+    kvstore миниатюру, созданную первым. Блокировка действует внутри
+    процесса; между процессами повтор возможен, но безвреден.
+    """
+    file = _thumbnail_file(name, geometry, options)
+    thumbnail = default.kvstore.get(file)
+    if thumbnail is not None:
+        return thumbnail
+    with _key_lock(file.key):
+        thumbnail = default.kvstore.get(file)
+        if thumbnail is not None:
+            return thumbnail
+        with timing.measure('thumbnail'):
+            return get_thumbnail(name, geometry, **options)
+
+
+def accepted_formats(accept):
+    """Дополнительные форматы, которые клиент явно назвал в Accept.
+
+    ``*/*`` не в счёт: его шлют и браузеры, не знающие WebP.
+    """
+    accepted = set()
+    for item in accept.split(','):
+        media_type, *params = (part.strip() for part in item.split(';'))
+        if 'q=0' in params or 'q=0.0' in params:
+            continue
+        accepted.add(media_type.lower())
+    return [
+        image_format for image_format in formats()
+        if Image.MIME[image_format] in accepted
+    ]
+
+
+def negotiate(name, geometry, options, accept):
+    """Самый лёгкий вариант из форматов, которые принимает клиент.
+
+    Адрес с явным форматом — из ``<source type>`` — отдаётся как есть;
+    для основного формата, который принимают все, выбирается меньший
+    файл среди него и форматов из Accept.
+    """
+    if 'format' in options:
+        return create(name, geometry, options)
+    candidates = [create(name, geometry, options)] + [
+        create(name, geometry, {**options, 'format': image_format})
+        for image_format in accepted_formats(accept)
+    ]
+    return min(
+        candidates,
+        key=lambda thumbnail: thumbnail.storage.size(thumbnail.name),
+    )
+
+
+def picture(post, preset):
+    """Данные для ``<picture>``: основная картинка и источники srcset.
+
+    Все адреса подписанные, поэтому отрисовка не проверяет, готовы ли
+    миниатюры. Размеры ``<img>`` берутся из геометрии пресета.
+    """
+    if not post.image:
+        return {'image': None, 'sources': [], 'srcset': ''}
+    srcsets = {}
+    for density, image_format in variants():
+        srcsets.setdefault(image_format, []).append(
+            f'{signed_url(post.image.name, preset, density, image_format)}'
+            f' {density}x'
+        )
+    width, height = parse_geometry(settings.THUMBNAIL_PRESETS[preset][0])
+    return {
+        'image': {
+            'url': signed_url(post.image.name, preset),
+            'width': width,
+            'height': height,
+        },
+        'sources': [
+            {'type': Image.MIME[image_format], 'srcset': ', '.join(srcset)}
+            for image_format, srcset in srcsets.items()
+            if image_format is not None
+        ],
+        'srcset': ', '.join(srcsets[None]),
+    }
@@ -0,0 +1,140 @@
+from django.conf import settings
+from django.db.models import Exists, F, OuterRef
+
+from .models import Follow, Post, TimelineEntry
+
+FOLLOW_ORDERING = ('-feed_date', '-feed_post')
+
+
+def _followers(author_id):
+    """Подписчики автора или None, если их больше порога рассылки.
+
+    Посты авторов, у которых подписчиков больше
+    TIMELINE_FANOUT_MAX_FOLLOWERS, не рассылаются: они подмешиваются
+    в ленту при чтении, см. ``follow_sources``.
+    """
+    limit = settings.TIMELINE_FANOUT_MAX_FOLLOWERS
+    followers = list(
+        Follow.objects.filter(author_id=author_id)
+        .values_list('user_id', flat=True)[:limit + 1]
+    )
+    return None if len(followers) > limit else followers
+
+
+def fan_out(post):
+    """Записывает новый пост в ленты подписчиков автора."""
+    followers = _followers(post.author_id)
+    if followers is None:
+        return
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers
+        ),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+    )
+    Post.objects.filter(pk=post.pk).update(fanned_out=True)
+    post.fanned_out = True
+
+
+def fan_out_author(author_id, posts=None):
+    """Рассылает ещё не разосланные посты автора; возвращает их число.
+
+    ``posts`` сужает выборку, например до только что импортированных.
+    """
+    followers = _followers(author_id)
+    if followers is None:
+        return 0
+    if posts is None:
+        posts = Post.objects.all()
+    posts = posts.filter(author_id=author_id, fanned_out=False)
+    batch_size = max(settings.TIMELINE_BATCH_SIZE // max(len(followers), 1), 1)
+    done = 0
+    last_id = 0
+    while True:
+        # Ключ по id: иначе каждая пачка заново пропускала бы уже
+        # разосланные посты автора.
+        batch = list(
+            posts.filter(id__gt=last_id)
+            .order_by('id').values_list('id', 'pub_date')[:batch_size]
+        )
+        if not batch:
+            return done
+        last_id = batch[-1][0]
+        TimelineEntry.objects.bulk_create(
+            (
+                TimelineEntry(user_id=user_id, post_id=post_id, pub_date=date)
+                for post_id, date in batch
+                for user_id in followers
+            ),
+            batch_size=settings.TIMELINE_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        Post.objects.filter(id__in=[post_id for post_id, _ in batch]).update(
+            fanned_out=True
+        )
+        done += len(batch)
+
+
+def fan_out_posts(posts):
+    """Рассылает посты из ``posts`` по авторам; возвращает их число."""
+    authors = posts.order_by().values_list('author_id', flat=True).distinct()
+    return sum(
+        fan_out_author(author_id, posts) for author_id in list(authors)
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту последние разосланные посты нового автора."""
+    posts = (
+        Post.objects.filter(author_id=author_id, fanned_out=True)
+        .order_by('-pub_date', '-id')
+        .values_list('id', 'pub_date')[:settings.TIMELINE_BACKFILL_SIZE]
+    )
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post_id=post_id, pub_date=date)
+            for post_id, date in posts
+        ),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def trim(user_id, author_id):
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def follow_posts(posts):
+    """Посты ленты подписок с её ключом сортировки (feed_date, feed_post)."""
+    return posts.annotate(feed_date=F('pub_date'), feed_post=F('id'))
+
+
+def follow_sources(posts, user):
+    """Источники ленты подписок с общим ключом (feed_date, feed_post).
+
+    Первый — материализованная лента пользователя, остальные — по
+    одному на автора из подписок, чьи посты не рассылались при
+    публикации. Каждый источник читается своим поиском по индексу с
+    LIMIT, поэтому страница не зависит от числа постов популярных
+    авторов; пагинатор сливает окна, см. ``MergingCursorPaginator``.
+    """
+    timeline = posts.filter(timeline_entries__user=user).annotate(
+        feed_date=F('timeline_entries__pub_date'),
+        feed_post=F('timeline_entries__post'),
+    )
+    unfanned = Post.objects.filter(fanned_out=False)
+    authors = (
+        Follow.objects.filter(user=user)
+        .annotate(unfanned=Exists(
+            unfanned.filter(author_id=OuterRef('author_id'))
+        ))
+        .filter(unfanned=True)
+        .values_list('author_id', flat=True)
+    )
+    return [timeline] + [
+        follow_posts(unfanned.filter(author_id=author_id))
+        for author_id in authors
+    ]
@@ -0,0 +1,127 @@
+"""Приведение загруженных картинок к виду для хранения.
+
+После фиксации поста файл обрабатывается в пуле процессов: поворот
+по EXIF, уменьшение до UPLOAD_MAX_SIDE, новая запись без метаданных.
+Имя и формат файла сохраняются. Pillow занят в отдельных процессах,
+поэтому ни рабочие процессы сайта, ни потоки миниатюр не ждут
+декодирования многомегапиксельных фото. Когда файл заменён, старые
+миниатюры удаляются и строятся заново.
+"""
+import logging
+import os
+import shutil
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from . import blobs, thumbnails
+
+logger = logging.getLogger(__name__)
+
+# Формат -> параметры записи.
+SAVE_OPTIONS = {
+    'JPEG': {'quality': None, 'optimize': True, 'progressive': True},
+    'WEBP': {'quality': None, 'method': 6},
+    'PNG': {'optimize': True},
+}
+
+_executor = None
+_lock = threading.Lock()
+
+
+def normalize(path, max_side, quality, originals_dir=None, name=None):
+    """Перезаписывает картинку ``path``; возвращает, заменён ли файл.
+
+    Выполняется в процессе пула, поэтому работает только с путями и не
+    трогает Django. Анимации и форматы без правил записи не меняются.
+    Оригинал копируется в ``originals_dir`` под именем ``name``.
+    """
+    with Image.open(path) as source:
+        image_format = source.format
+        if image_format not in SAVE_OPTIONS or getattr(
+            source, 'is_animated', False
+        ):
+            return False
+        icc_profile = source.info.get('icc_profile')
+        image = ImageOps.exif_transpose(source)
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        # Пустой exif не даёт Pillow переписать EXIF из исходника.
+        options = {
+            key: quality if value is None else value
+            for key, value in SAVE_OPTIONS[image_format].items()
+        }
+        options['exif'] = b''
+        if icc_profile:
+            options['icc_profile'] = icc_profile
+        temporary = f'{path}.normalized'
+        image.save(temporary, image_format, **options)
+    if originals_dir:
+        original = os.path.join(originals_dir, name)
+        os.makedirs(os.path.dirname(original), exist_ok=True)
+        shutil.copy2(path, original)
+    os.replace(temporary, path)
+    return True
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.UPLOAD_WORKERS
+            )
+        return _executor
+
+
+def _arguments(name):
+    return (
+        default_storage.path(name),
+        settings.UPLOAD_MAX_SIDE,
+        settings.UPLOAD_QUALITY,
+        settings.UPLOAD_ORIGINALS_DIR,
+        name,
+    )
+
+
+def _finished(name, future):
+    try:
+        replaced = future.result()
+    except Exception:
+        logger.exception('Не удалось обработать картинку %s', name)
+        return
+    if replaced:
+        thumbnails.refresh(name)
+    else:
+        thumbnails.enqueue(name)
+
+
+def submit(name):
+    """Обрабатывает файл в пуле, затем ставит миниатюры в очередь.
+
+    При UPLOAD_WORKERS = 0 файл обрабатывается сразу в этом процессе.
+    """
+    if settings.UPLOAD_WORKERS:
+        future = _get_executor().submit(normalize, *_arguments(name))
+    else:
+        future = Future()
+        try:
+            future.set_result(normalize(*_arguments(name)))
+        except Exception as error:
+            future.set_exception(error)
+    future.add_done_callback(lambda done: _finished(name, done))
+
+
+def schedule(image):
+    """Обрабатывает новый файл после фиксации транзакции.
+
+    Файл, на который ссылается и другой пост, уже обработан.
+    """
+    if image and blobs.refs(image.name) == 1:
+        name = image.name
+        transaction.on_commit(lambda: submit(name))
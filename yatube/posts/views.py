@@ -1,30 +1,43 @@
+import mimetypes
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.core import signing
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from . import (
+    conditional, counters, counts, exporting, feeds, thumbnails,
+    uploads,
+)
 from .forms import CommentForm, PostForm
 from .models import Group, Post, User, Follow
 
 
-LIMIT_POST = 10
-
-
 def index(request):
-    posts_list = Post.objects.all()
-    paginator = Paginator(posts_list, LIMIT_POST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = feeds.paginate(
+        request,
+        feeds.index_feed(),
+        counts.scope_counter(counts.global_scope()),
+    )
     context = {
         'page_obj': page_obj
     }
     return render(request, 'posts/index.html', context)
 
 
+@conditional.tagged_page(
+    conditional.group_page, conditional.group_page_tags
+)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts_list = group.posts.all()
-    paginator = Paginator(posts_list, LIMIT_POST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    group = conditional.page_object(request)
+    page_obj = feeds.paginate(
+        request,
+        feeds.group_feed(group),
+        counts.scope_counter(counts.group_scope(group.id)),
+    )
     context = {
         'group': group,
         'page_obj': page_obj
@@ -36,10 +49,13 @@ def group_posts(request, slug):
     )
 
 
+@conditional.tagged_page(
+    conditional.post_page, conditional.post_page_tags
+)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = conditional.page_object(request)
     form = CommentForm()
-    comments = post.comments.all()
+    comments = feeds.comments_page(request, post)
     context = {
         'post': post,
         'form': form,
@@ -52,12 +68,54 @@ def post_detail(request, post_id):
     )
 
 
+@conditional.tagged_page(
+    conditional.comments_page, conditional.comments_page_tags
+)
+def post_comments(request, post_id):
+    """Следующая страница комментариев для кнопки «Показать ещё»."""
+    post = conditional.page_object(request)
+    context = {
+        'post': post,
+        'comments': feeds.comments_page(request, post),
+    }
+    return render(request, 'includes/comment_list.html', context)
+
+
+def signed_thumbnail(request, token):
+    """Миниатюра по подписанному адресу; создаётся при первом запросе.
+
+    Для основного формата отдаётся самый лёгкий из вариантов, которые
+    принимает клиент, поэтому ответ зависит от Accept.
+    """
+    try:
+        name, geometry, options = thumbnails.unsign(token)
+    except signing.BadSignature:
+        raise Http404
+    image = thumbnails.negotiate(
+        name, geometry, options, request.META.get('HTTP_ACCEPT', '')
+    )
+    if not image.exists():
+        raise Http404
+    response = FileResponse(
+        image.storage.open(image.name),
+        content_type=mimetypes.guess_type(image.name)[0],
+    )
+    if 'format' not in options:
+        patch_vary_headers(response, ['Accept'])
+    patch_cache_control(response, public=True, max_age=60 * 60 * 24)
+    return response
+
+
+@conditional.tagged_page(
+    conditional.profile_page, conditional.profile_page_tags
+)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    author_list = author.posts.all()
-    paginator = Paginator(author_list, LIMIT_POST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    author = conditional.page_object(request)
+    stats = counters.stats_for(author)
+    author_list = feeds.author_feed(author)
+    page_obj = feeds.paginate(
+        request, author_list, counts.stats_counter(stats)
+    )
     following = (request.user.is_authenticated
                  and Follow.objects.filter(
                      user=request.user,
@@ -68,6 +126,8 @@ def profile(request, username):
         'page_obj': page_obj,
         'author_list': author_list,
         'following': following,
+        'stats': stats,
+        'posts_count': stats.posts_count,
     }
     return render(
         request,
@@ -76,6 +136,18 @@ def profile(request, username):
     )
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        page_obj = feeds.search_page(request, query)
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -86,6 +158,7 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        uploads.schedule(post.image)
         return redirect('posts:profile', request.user.username)
     return render(
         request,
@@ -104,6 +177,8 @@ def post_edit(request, post_id):
     )
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            uploads.schedule(post.image)
         return redirect('posts:post_detail', post.id)
     return render(
         request,
@@ -126,10 +201,11 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, LIMIT_POST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = feeds.paginate(
+        request,
+        feeds.follow_feed(request.user),
+        counts.follow_counter(request.user),
+    )
     context = {
         'page_obj': page_obj,
     }
@@ -150,3 +226,45 @@ def profile_unfollow(request, username):
     if author != request.user:
         Follow.objects.filter(user=request.user, author=author).delete()
     return redirect("posts:profile", username=username)
+
+
+def export_response(request, querysets, name):
+    """Потоковая выгрузка: ?kind=posts|comments, ?format=jsonl|csv."""
+    kind = request.GET.get('kind', 'posts')
+    format = request.GET.get('format', 'jsonl')
+    if kind not in exporting.KINDS or format not in exporting.FORMATS:
+        raise Http404
+    response = StreamingHttpResponse(
+        exporting.render(
+            kind,
+            exporting.rows(
+                kind, querysets[kind], settings.EXPORT_BATCH_SIZE
+            ),
+            format,
+        ),
+        content_type=exporting.CONTENT_TYPES[format],
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{name}-{kind}.{format}"'
+    )
+    return response
+
+
+@login_required
+def profile_export(request, username):
+    author = get_object_or_404(User, username=username)
+    if request.user != author and not request.user.is_staff:
+        raise PermissionDenied
+    return export_response(
+        request, exporting.author_querysets(author), author.username
+    )
+
+
+@login_required
+def group_export(request, slug):
+    if not request.user.is_staff:
+        raise PermissionDenied
+    group = get_object_or_404(Group, slug=slug)
+    return export_response(
+        request, exporting.group_querysets(group), group.slug
+    )
@@ -28,6 +28,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -106,6 +108,8 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 PAGINATOR_ITEMS_ON_PAGE = 10
 
+COMMENTS_ON_PAGE = 20
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
@@ -116,3 +120,54 @@ CACHES = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+
+PAGINATOR_EXACT_COUNT_LIMIT = 10000
+
+POST_COUNT_CACHE_TIMEOUT = 60 * 60 * 24
+
+TIMELINE_FANOUT_MAX_FOLLOWERS = 1000
+
+TIMELINE_BACKFILL_SIZE = 1000
+
+TIMELINE_BATCH_SIZE = 500
+
+FEED_CACHE_TIMEOUT = 60 * 60 * 3
+
+ARTICLE_CACHE_TIMEOUT = 60 * 60 * 24
+
+THUMBNAIL_PRESETS = {
+    'preview': ('100x100', {'crop': 'center'}),
+}
+
+# Плотности экрана и дополнительные форматы вариантов миниатюр;
+# форматы, которые Pillow не умеет писать, пропускаются.
+THUMBNAIL_DENSITIES = (1, 2)
+
+THUMBNAIL_FORMATS = ('AVIF', 'WEBP')
+
+THUMBNAIL_WORKERS = 2
+
+# Загруженные картинки: длинная сторона, качество JPEG и WebP, число
+# процессов обработки (0 — сразу в процессе сайта) и каталог для
+# оригиналов (None — не хранить).
+UPLOAD_MAX_SIDE = 2048
+
+UPLOAD_QUALITY = 85
+
+UPLOAD_WORKERS = 2
+
+UPLOAD_ORIGINALS_DIR = None
+
+EXPORT_BATCH_SIZE = 2000
+
+API_MAX_PAGE_SIZE = 100
+
+# Доля запросов с заголовком Server-Timing; 0 отключает замер.
+SERVER_TIMING_SAMPLE_RATE = 1.0 if DEBUG else 0.01
+
+# Каталог файлов метрик рабочих процессов, отдельный для сервиса; пустое
+# значение отключает сбор. Без METRICS_TOKEN /metrics видит только
+# персонал, с ним — и сборщик с заголовком «Authorization: Bearer …».
+METRICS_DIR = None
+
+METRICS_TOKEN = None
@@ -0,0 +1,18 @@
+"""Настройки тестов.
+
+Загрузки и миниатюры обрабатываются сразу в процессе тестов: пулы
+не видят тестовую базу в памяти. Файлы пишутся во временный каталог,
+который удаляется после прогона.
+"""
+import atexit
+import shutil
+import tempfile
+
+from .settings import *  # noqa: F401,F403
+
+THUMBNAIL_WORKERS = 0
+
+UPLOAD_WORKERS = 0
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix='yatube-media-')
+atexit.register(shutil.rmtree, MEDIA_ROOT, ignore_errors=True)